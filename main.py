@@ -4,6 +4,7 @@ Sales Automation Agent - FastAPI Main Application
 
 import os
 import logging
+from contextlib import asynccontextmanager
 from typing import Dict, Any, Optional
 import uvicorn
 from fastapi import FastAPI, HTTPException, BackgroundTasks
@@ -15,9 +16,14 @@ from google.adk.cli.fast_api import get_fast_api_app
 from google.genai import types
 
 # Import our components
-from sales_automation.agent import sales_orchestrator
+from sales_automation.agent import (
+    get_orchestrator,
+    get_credential_state,
+    get_event_text,
+)
 from utils.data_models import AgentResponse, TaskRequest
-from utils.supabase_client import supabase_client
+from utils.auth import oauth_manager
+from utils.supabase_client import get_supabase_client, close_supabase_client
 
 # Load environment variables
 load_dotenv()
@@ -38,6 +44,18 @@ ALLOWED_ORIGINS = ["*"]
 # Set web=True if you intend to serve a web interface, False otherwise
 SERVE_WEB_INTERFACE = True
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared clients on startup and close them on shutdown"""
+    await get_supabase_client()
+    await oauth_manager.startup(prefetch=True)
+    app.state.oauth_manager = oauth_manager
+    yield
+    await oauth_manager.shutdown()
+    await close_supabase_client()
+
+
 # Call the function to get the FastAPI app instance
 # Ensure the agent directory name ('capital_agent') matches your agent folder
 app: FastAPI = get_fast_api_app(
@@ -45,6 +63,7 @@ app: FastAPI = get_fast_api_app(
     # session_service=session_service,
     allow_origins=ALLOWED_ORIGINS,
     web=SERVE_WEB_INTERFACE,
+    lifespan=lifespan,
 )
 
 
@@ -71,33 +90,27 @@ async def chat(request: ChatRequest, background_tasks: BackgroundTasks):
             raise HTTPException(status_code=400, detail="Message cannot be empty")
 
         # Get or create a session
+        sales_orchestrator = get_orchestrator()
         session = await sales_orchestrator._get_or_create_session(request.user_id)
 
+        # Access tokens reach the tools through session state, not the prompt
+        credentials = await oauth_manager.get_user_credentials(request.user_id)
+
         # Create content object for the runner
         content = types.Content(
             role="user",
             parts=[types.Part(text=request.message + f"user_id: {request.user_id}")],
         )
 
-        # Run the agent with the session
-        events = []
+        # Run the agent with the session, keeping only the last text response
+        response_message = "Response from agent"
         async for event in sales_orchestrator.runner.run_async(
             user_id=request.user_id,
             session_id=session.id,  # Use the session ID we just got/created
             new_message=content,
+            state_delta=get_credential_state(credentials) if credentials else None,
         ):
-            events.append(event)
-
-        # Extract response from events
-        response_message = "Response from agent"
-        for event in events:
-            if hasattr(event, "content") and event.content and event.content.parts:
-                text_parts = []
-                for part in event.content.parts:
-                    if hasattr(part, "text") and part.text:
-                        text_parts.append(part.text)
-                if text_parts:
-                    response_message = " ".join(text_parts)
+            response_message = get_event_text(event) or response_message
 
         response = AgentResponse(
             success=True,
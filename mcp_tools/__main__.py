@@ -0,0 +1,141 @@
+"""
+Combined MCP Server exposing every sales automation tool from one process
+"""
+
+import sys
+import json
+import logging
+import asyncio
+import importlib
+from types import ModuleType
+from typing import Any, Sequence, Dict
+from dotenv import load_dotenv
+
+load_dotenv()
+from mcp.server import Server
+from mcp.server.stdio import stdio_server
+from mcp.types import Tool, TextContent
+
+logger = logging.getLogger(__name__)
+
+# Tool modules served by default; mcp_tools.supabase_client is served only
+# when named on the command line
+TOOL_MODULES = (
+    "mcp_tools.azure_logic_app",
+    "mcp_tools.hunter_io",
+    "mcp_tools.airtable_crm",
+    "mcp_tools.gmail_sender",
+    "mcp_tools.web_scraper",
+    "mcp_tools.openai_client",
+)
+
+# Tool modules served by this process, overridable on the command line
+served_modules = TOOL_MODULES
+
+# Create MCP server
+server = Server("sales-automation-tools-server")
+
+# Tool name -> module that implements it
+_tool_modules: Dict[str, ModuleType] = {}
+
+BATCH_TOOL = Tool(
+    name="batch",
+    description="Run several tool calls concurrently in one invocation, e.g. one find_emails or update_lead per lead",
+    inputSchema={
+        "type": "object",
+        "properties": {
+            "invocations": {
+                "type": "array",
+                "description": "Tool calls to run",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "tool_name": {
+                            "type": "string",
+                            "description": "Name of the tool to call",
+                        },
+                        "args": {
+                            "type": "object",
+                            "description": "Arguments for the tool",
+                        },
+                    },
+                    "required": ["tool_name", "args"],
+                },
+            }
+        },
+        "required": ["invocations"],
+    },
+)
+
+
+@server.list_tools()
+async def list_tools() -> list[Tool]:
+    """List the tools of every served module."""
+    tools = []
+    for module_name in served_modules:
+        module = importlib.import_module(module_name)
+        for tool in await module.list_tools():
+            _tool_modules[tool.name] = module
+            tools.append(tool)
+
+    tools.append(BATCH_TOOL)
+    return tools
+
+
+@server.call_tool()
+async def call_tool(name: str, arguments: dict[str, Any]) -> Sequence[TextContent]:
+    """Route tool calls to the module that implements the tool."""
+    if not _tool_modules:
+        await list_tools()
+
+    if name == "batch":
+        return await call_batch(arguments.get("invocations", []))
+
+    module = _tool_modules.get(name)
+    if module is None:
+        raise ValueError(f"Unknown tool: {name}")
+
+    return await module.call_tool(name, arguments)
+
+
+async def call_batch(invocations: list[dict[str, Any]]) -> Sequence[TextContent]:
+    """Run tool invocations concurrently and return their results in order."""
+    if any(invocation.get("tool_name") == "batch" for invocation in invocations):
+        raise ValueError("batch invocations cannot call batch")
+
+    results = await asyncio.gather(
+        *(
+            call_tool(invocation.get("tool_name", ""), invocation.get("args") or {})
+            for invocation in invocations
+        ),
+        return_exceptions=True,
+    )
+
+    batch_results = []
+    for invocation, result in zip(invocations, results):
+        if isinstance(result, Exception):
+            output = f"Error: {str(result)}"
+        else:
+            output = "\n".join(content.text for content in result)
+        batch_results.append(
+            {"tool_name": invocation.get("tool_name"), "result": output}
+        )
+
+    return [TextContent(type="text", text=json.dumps(batch_results, indent=2))]
+
+
+async def main():
+    """Run the combined MCP server."""
+    logger.info("Starting Sales Automation Tools MCP Server...")
+
+    async with stdio_server() as (read_stream, write_stream):
+        await server.run(
+            read_stream, write_stream, server.create_initialization_options()
+        )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) > 1:
+        served_modules = tuple(sys.argv[1:])
+    asyncio.run(main())
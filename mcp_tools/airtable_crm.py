@@ -253,14 +253,14 @@ async def get_base_id(arguments: Dict[str, Any]) -> Sequence[TextContent]:
 
         # Get Airtable token from Supabase
         client = create_client(supabase_url, supabase_key)
-        response = (
+        query = (
             client.table("oauth_connections")
-            .select("*")
+            .select("access_token")
             .eq("user_id", user_id)
             .eq("provider", "airtable")
             .eq("is_active", True)
-            .execute()
         )
+        response = await asyncio.to_thread(query.execute)
 
         if not response.data:
             return [
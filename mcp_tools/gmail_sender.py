@@ -5,12 +5,12 @@ Gmail MCP Server for sending emails
 import os
 import logging
 import asyncio
-import base64
 from typing import Any, Sequence, Dict
 import httpx
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import Tool, TextContent
+from utils.helpers import create_email_mime
 
 logger = logging.getLogger(__name__)
 
@@ -110,19 +110,7 @@ def create_mime_message(
     from_email: str, to_email: str, subject: str, body: str, is_html: bool = False
 ) -> str:
     """Create MIME email message and encode it for Gmail API"""
-    content_type = "text/html" if is_html else "text/plain"
-
-    mime_message = (
-        f"From: {from_email}\r\n"
-        f"To: {to_email}\r\n"
-        f"Subject: {subject}\r\n"
-        f'Content-Type: {content_type}; charset="UTF-8"\r\n'
-        f"\r\n"
-        f"{body}"
-    )
-
-    # Encode to base64 URL-safe
-    return base64.urlsafe_b64encode(mime_message.encode()).decode()
+    return create_email_mime(from_email, to_email, subject, body, is_html)
 
 
 async def send_email(arguments: Dict[str, Any]) -> Sequence[TextContent]:
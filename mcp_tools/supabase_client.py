@@ -20,6 +20,17 @@ logger = logging.getLogger(__name__)
 # Create MCP server
 server = Server("supabase-client-server")
 
+# oauth_connections columns read by get_oauth_connection; tokens are used for
+# refreshing only and never returned
+OAUTH_COLS = "refresh_token,provider_email,token_expires_at,created_at,updated_at"
+
+
+def _parse_ts(value: str) -> datetime:
+    """Parse a PostgREST timestamp, which may use a trailing Z for UTC"""
+    if value.endswith("Z"):
+        return datetime.fromisoformat(value[:-1] + "+00:00")
+    return datetime.fromisoformat(value)
+
 
 @server.list_tools()
 async def list_tools() -> list[Tool]:
@@ -27,7 +38,7 @@ async def list_tools() -> list[Tool]:
     return [
         Tool(
             name="get_oauth_connection",
-            description="Get specific OAuth connection for a user and provider",
+            description="Get the status and expiry of a user's OAuth connection for a provider, refreshing an expired token",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -89,16 +100,15 @@ async def get_oauth_connection(arguments: Dict[str, Any]) -> Sequence[TextConten
 
         client = create_client(supabase_url, supabase_key)
 
-        # Execute request
-        response = (
+        # Execute request off the event loop, as supabase-py is synchronous
+        query = (
             client.table("oauth_connections")
-            .select("*")
+            .select(OAUTH_COLS)
             .eq("user_id", user_id)
             .eq("provider", provider)
             .eq("is_active", True)
-            .execute()
         )
-        import asyncio
+        response = await asyncio.to_thread(query.execute)
 
         await asyncio.sleep(3)
 
@@ -111,9 +121,7 @@ async def get_oauth_connection(arguments: Dict[str, Any]) -> Sequence[TextConten
             ]
 
         row = response.data[0]
-        token_expires_at = datetime.fromisoformat(
-            row["token_expires_at"].replace("Z", "+00:00")
-        )
+        token_expires_at = _parse_ts(row["token_expires_at"])
         is_expired = datetime.now(timezone.utc) >= token_expires_at
 
         # If token is expired, try to refresh it
@@ -147,13 +155,8 @@ async def get_oauth_connection(arguments: Dict[str, Any]) -> Sequence[TextConten
                                     ),
                                     expires_in=token_data.get("expires_in", 3600),
                                 )
-                                row["access_token"] = updated_data["access_token"]
-                                if "refresh_token" in updated_data:
-                                    row["refresh_token"] = updated_data["refresh_token"]
-                                token_expires_at = datetime.fromisoformat(
-                                    updated_data["token_expires_at"].replace(
-                                        "Z", "+00:00"
-                                    )
+                                token_expires_at = _parse_ts(
+                                    updated_data["token_expires_at"]
                                 )
                                 is_expired = False
                             except Exception as e:
@@ -194,13 +197,8 @@ async def get_oauth_connection(arguments: Dict[str, Any]) -> Sequence[TextConten
                                     ),
                                     expires_in=token_data.get("expires_in", 3600),
                                 )
-                                row["access_token"] = updated_data["access_token"]
-                                if "refresh_token" in updated_data:
-                                    row["refresh_token"] = updated_data["refresh_token"]
-                                token_expires_at = datetime.fromisoformat(
-                                    updated_data["token_expires_at"].replace(
-                                        "Z", "+00:00"
-                                    )
+                                token_expires_at = _parse_ts(
+                                    updated_data["token_expires_at"]
                                 )
                                 is_expired = False
                             except Exception as e:
@@ -217,8 +215,6 @@ async def get_oauth_connection(arguments: Dict[str, Any]) -> Sequence[TextConten
         result = {
             "user_id": user_id,
             "provider": provider,
-            "access_token": row["access_token"],
-            "refresh_token": row["refresh_token"],
             "provider_email": row["provider_email"],
             "expires_at": token_expires_at.isoformat(),
             "is_expired": is_expired,
@@ -279,16 +275,14 @@ async def update_oauth_tokens(
         if provider == "airtable" and refresh_token:
             update_data["refresh_token"] = refresh_token
 
-        # Execute request
-        response = (
+        # Execute request off the event loop, as supabase-py is synchronous
+        query = (
             client.table("oauth_connections")
             .update(update_data)
             .eq("user_id", user_id)
             .eq("provider", provider)
-            .execute()
         )
-
-        import asyncio
+        response = await asyncio.to_thread(query.execute)
 
         await asyncio.sleep(3)
 
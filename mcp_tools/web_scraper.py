@@ -4,7 +4,10 @@ Web Scraper MCP Server for extracting content from websites
 
 import logging
 import asyncio
-from typing import Any, Sequence, Dict, List
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Sequence, Dict, List, Optional
 import httpx
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
@@ -17,6 +20,86 @@ logger = logging.getLogger(__name__)
 # Create MCP server
 server = Server("web-scraper-server")
 
+# Per-host concurrency limits and retry policy for outbound fetches;
+# host -> [semaphore, fetches holding or awaiting it], dropped when the host
+# has no fetches left
+HOST_SEMAPHORES: Dict[str, list] = {}
+MAX_REQUESTS_PER_HOST = 4
+MAX_RETRIES = 3
+RETRYABLE_STATUS_CODES = {429, 503}
+# Longest Retry-After worth waiting for; longer waits return the response
+MAX_RETRY_DELAY = 30
+
+
+def _get_retry_after(response: httpx.Response) -> Optional[float]:
+    """Parse the Retry-After header (seconds or HTTP date) into a delay"""
+    retry_after = response.headers.get("Retry-After")
+    if not retry_after:
+        return None
+
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+async def fetch_url(client: httpx.AsyncClient, url: str) -> httpx.Response:
+    """GET a URL, limiting concurrency per host and backing off on throttling"""
+    host = urlparse(url).netloc
+    limit = HOST_SEMAPHORES.get(host)
+    if limit is None:
+        limit = HOST_SEMAPHORES[host] = [
+            asyncio.Semaphore(MAX_REQUESTS_PER_HOST),
+            0,
+        ]
+    limit[1] += 1
+    try:
+        return await _fetch_url(client, url, limit[0])
+    finally:
+        limit[1] -= 1
+        if not limit[1]:
+            del HOST_SEMAPHORES[host]
+
+
+async def _fetch_url(
+    client: httpx.AsyncClient, url: str, semaphore: asyncio.Semaphore
+) -> httpx.Response:
+    """GET a URL under its host's concurrency limit, retrying on throttling"""
+    for attempt in range(MAX_RETRIES + 1):
+        response = None
+        async with semaphore:
+            try:
+                response = await client.get(url)
+            except httpx.TransportError:
+                if attempt == MAX_RETRIES:
+                    raise
+
+        if response is not None:
+            if (
+                response.status_code not in RETRYABLE_STATUS_CODES
+                or attempt == MAX_RETRIES
+            ):
+                return response
+            delay = _get_retry_after(response)
+            if delay is not None and delay > MAX_RETRY_DELAY:
+                return response
+        else:
+            delay = None
+
+        if delay is None:
+            delay = 2**attempt + random.random()
+
+        logger.warning(
+            f"Retrying {url} in {delay:.1f}s (attempt {attempt + 1}/{MAX_RETRIES})"
+        )
+        await asyncio.sleep(delay)
+
 
 @server.list_tools()
 async def list_tools() -> list[Tool]:
@@ -103,7 +186,7 @@ async def scrape_website(arguments: Dict[str, Any]) -> Sequence[TextContent]:
         }
 
         async with httpx.AsyncClient(timeout=30.0, headers=headers) as client:
-            response = await client.get(url)
+            response = await fetch_url(client, url)
 
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, "html.parser")
@@ -171,7 +254,7 @@ async def extract_company_info(arguments: Dict[str, Any]) -> Sequence[TextConten
         }
 
         async with httpx.AsyncClient(timeout=30.0, headers=headers) as client:
-            response = await client.get(url)
+            response = await fetch_url(client, url)
 
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, "html.parser")
@@ -284,7 +367,7 @@ async def find_relevant_pages(arguments: Dict[str, Any]) -> Sequence[TextContent
         }
 
         async with httpx.AsyncClient(timeout=30.0, headers=headers) as client:
-            response = await client.get(url)
+            response = await fetch_url(client, url)
 
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, "html.parser")
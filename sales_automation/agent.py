@@ -3,7 +3,14 @@ Root Agent - Main orchestrator for the Sales Automation Agent
 """
 
 import os
+import re
+import uuid
+import asyncio
 import logging
+import time
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
 from typing import Dict, Any, List, Optional
 from dotenv import load_dotenv
 
@@ -12,10 +19,12 @@ from google.adk.agents import Agent
 from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset, StdioServerParameters
 from google.adk.tools.mcp_tool import StdioConnectionParams
 from google.adk.sessions import InMemorySessionService
+from google.adk.sessions.base_session_service import GetSessionConfig
 from google.adk.runners import Runner
-from .prompts import get_root_agent_instructions
+from google import genai
+from google.genai import types
+from .prompts import get_root_agent_instructions, get_task_parsing_prompt
 from utils.auth import oauth_manager
-from utils.supabase_client import supabase_client
 from utils.data_models import TaskRequest, AgentResponse
 from utils.helpers import extract_json_from_text
 
@@ -24,115 +33,245 @@ logger = logging.getLogger(__name__)
 # Session service for the agent
 session_service = InMemorySessionService()
 
+# Task parsing is a pure classification call, so it goes straight to a small
+# model in JSON mode instead of through the root agent and its tool schemas
+TASK_PARSER_MODEL = "gemini-2.5-flash-lite"
+_TASK_PARSER_CONFIG = types.GenerateContentConfig(
+    system_instruction=get_task_parsing_prompt(),
+    response_mime_type="application/json",
+)
+
+# Short messages without any of these words are chit-chat and are answered
+# without calling the parser model
+_TASK_KEYWORDS_RE = re.compile(
+    r"\b(find|search|prospect\w*|enrich\w*|qualif\w*|scor\w*|personali[sz]\w*"
+    r"|write|send|emails?|leads?|compan(?:y|ies))\b",
+    re.IGNORECASE,
+)
+MAX_CONVERSATIONAL_LENGTH = 20
+CONVERSATIONAL_RESPONSE = (
+    "Hi! I can help with prospecting, enrichment, qualification, and "
+    "personalized outreach. What would you like to do?"
+)
+_GREETING_RE = re.compile(
+    r"^\W*(hi|hello|hey|hiya|howdy|yo|good (?:morning|afternoon|evening)"
+    r"|thanks|thank you|ok|okay)\b",
+    re.IGNORECASE,
+)
+
+
+def is_greeting(message: str) -> bool:
+    """Whether a message is a short greeting with no task in it"""
+    return (
+        len(message) < MAX_CONVERSATIONAL_LENGTH
+        and _GREETING_RE.match(message) is not None
+        and not _TASK_KEYWORDS_RE.search(message)
+    )
 
-def create_root_agent() -> Agent:
-    """Create the root orchestrator agent with all MCP tools"""
 
-    # MCP Tools for external integrations
-    mcp_tools = []
+# Parsed tasks are reused for repeated messages (double submits, retries)
+PARSE_CACHE_SIZE = 128
+PARSE_CACHE_TTL = 30
 
-    # Azure Logic App MCP Tool
-    azure_tool = MCPToolset(
-        connection_params=StdioConnectionParams(
-            server_params=StdioServerParameters(
-                command="python",
-                args=["-m", "mcp_tools.azure_logic_app"],
-                env={"AZURE_LOGIC_APP_URL": os.getenv("AZURE_LOGIC_APP_URL", "")},
-            ),
-            timeout=60,
-        ),
-    )
-    mcp_tools.append(azure_tool)
+# Each workflow consumes the leads produced by its upstream stage, so a task has
+# to wait for its upstream task when both are requested; others run concurrently
+TASK_DEPENDENCIES = {
+    "enrichment": "prospecting",
+    "qualify": "enrichment",
+    "personalize": "qualify",
+}
 
-    # Hunter.io MCP Tool
-    hunter_tool = MCPToolset(
-        connection_params=StdioConnectionParams(
-            server_params=StdioServerParameters(
-                command="python",
-                args=["-m", "mcp_tools.hunter_io"],
-                env={"HUNTER_API_KEY": os.getenv("HUNTER_API_KEY", "")},
-            ),
-            timeout=60,
-        ),
-    )
-    mcp_tools.append(hunter_tool)
+# Requests a single user can have in flight at once
+MAX_CONCURRENT_REQUESTS_PER_USER = 4
 
-    # Airtable CRM MCP Tool
-    airtable_tool = MCPToolset(
-        connection_params=StdioConnectionParams(
-            server_params=StdioServerParameters(
-                command="python",
-                args=["-m", "mcp_tools.airtable_crm"],
-            ),
-            timeout=60,
-        ),
-    )
-    mcp_tools.append(airtable_tool)
+# Each user's conversation lives in one session under a fixed ID; lookups only
+# need the session itself, not its event history
+CONVERSATION_SESSION_ID = "conversation"
+_SESSION_LOOKUP_CONFIG = GetSessionConfig(num_recent_events=1)
 
-    # Gmail MCP Tool
-    gmail_tool = MCPToolset(
-        connection_params=StdioConnectionParams(
-            server_params=StdioServerParameters(
-                command="python",
-                args=["-m", "mcp_tools.gmail_sender"],
-            ),
-            timeout=60,
-        ),
-    )
-    mcp_tools.append(gmail_tool)
+# Concurrent tasks run in their own throwaway sessions, one per task run, to
+# avoid racing on session state
+TASK_SESSION_PREFIX = "task-"
+_task_session: ContextVar[Optional[Any]] = ContextVar("task_session", default=None)
 
-    # Web Scraper MCP Tool
-    web_scraper_tool = MCPToolset(
-        connection_params=StdioConnectionParams(
-            server_params=StdioServerParameters(
-                command="python",
-                args=["-m", "mcp_tools.web_scraper"],
-            ),
-            timeout=60,
-        ),
-    )
-    mcp_tools.append(web_scraper_tool)
 
-    # OpenAI MCP Tool
-    openai_tool = MCPToolset(
-        connection_params=StdioConnectionParams(
-            server_params=StdioServerParameters(
-                command="python",
-                args=["-m", "mcp_tools.openai_client"],
-                env={"OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "")},
-            ),
-            timeout=60,
-        ),
+def get_event_text(event) -> str:
+    """Join the text parts of an agent event, or return "" if it has none"""
+    if not getattr(event, "content", None) or not event.content.parts:
+        return ""
+    return " ".join(
+        part.text for part in event.content.parts if getattr(part, "text", None)
     )
-    mcp_tools.append(openai_tool)
 
-    # Supabase MCP Tool
-    supabase_tool = MCPToolset(
+
+def group_task_stages(tasks: List[str]) -> List[List[str]]:
+    """Group tasks into stages that can run concurrently, preserving order"""
+    stages = []
+    for task_type in tasks:
+        if (
+            not stages
+            or task_type in stages[-1]
+            or TASK_DEPENDENCIES.get(task_type) in stages[-1]
+        ):
+            stages.append([task_type])
+        else:
+            stages[-1].append(task_type)
+    return stages
+
+
+# Access tokens never go into prompts: they are kept in session state and
+# filled into the arguments of the tools that need them
+_TOOL_CREDENTIAL_PROVIDERS = {
+    "create_leads": "airtable",
+    "update_lead": "airtable",
+    "search_leads": "airtable",
+    "get_personas": "airtable",
+    "send_email": "gmail",
+    "create_draft": "gmail",
+}
+
+
+def get_credential_state(credentials: Dict[str, Any]) -> Dict[str, str]:
+    """Session state entries holding the user's access tokens"""
+    return {
+        f"{provider}_access_token": creds["access_token"]
+        for provider, creds in credentials.items()
+        if creds and creds.get("access_token")
+    }
+
+
+def _fill_access_token(tool_name: str, args: Dict[str, Any], state) -> None:
+    """Set the access_token argument of a CRM or email tool call"""
+    provider = _TOOL_CREDENTIAL_PROVIDERS.get(tool_name)
+    if provider:
+        access_token = state.get(f"{provider}_access_token")
+        if access_token:
+            args["access_token"] = access_token
+
+
+def inject_tool_credentials(tool, args: Dict[str, Any], tool_context) -> None:
+    """Fill the access_token argument of CRM and email tools from session state"""
+    if tool.name == "batch":
+        for invocation in args.get("invocations", []):
+            if isinstance(invocation.get("args"), dict):
+                _fill_access_token(
+                    invocation.get("tool_name", ""),
+                    invocation["args"],
+                    tool_context.state,
+                )
+    else:
+        _fill_access_token(tool.name, args, tool_context.state)
+    return None
+
+
+# Workflow prompt templates, formatted per call; the static text comes first so
+# it stays byte-identical across calls for model-side prompt caching
+_PROSPECTING_PROMPT = """
+Execute a prospecting workflow:
+1. Use the Azure Logic App tool to search for companies with this query: "{query}"
+2. Get the user's Airtable base ID
+3. Parse and structure the company data
+4. Create lead records in the user's Airtable CRM
+5. Provide a summary of results
+
+User ID: {user_id}
+"""
+
+_ENRICHMENT_PROMPT = """
+Execute an enrichment workflow:
+1. Get the user's Airtable base ID
+2. Search for unenriched leads (Enriched = false or empty)
+3. Collect the record ID and website domain of every lead with a website
+4. Make one `batch` call with a find_emails invocation per domain and an
+   extract_company_info invocation per website
+5. Make one `batch` call with an update_lead invocation per lead that sets the
+   enriched data and marks the lead as enriched
+6. Provide a summary of enrichment results
+
+User ID: {user_id}
+"""
+
+_QUALIFICATION_PROMPT = """
+Execute a lead qualification workflow:
+1. Get the user's Airtable base ID
+2. Get the user's ICP (Ideal Customer Persona) from the Personas table for user: {user_id}
+3. Search for enriched leads without scores (Enriched = true AND Score = empty)
+4. Collect the record IDs of all found leads
+5. Make one `batch` call with a score_lead invocation per lead against the ICP
+6. Parse the scoring results (Hot/Warm/Cold + reasoning)
+7. Make one `batch` call with an update_lead invocation per lead that sets the
+   score and reasoning
+8. Provide a summary with score distribution
+
+User ID: {user_id}
+"""
+
+_PERSONALIZATION_PROMPT = """
+Execute an email personalization workflow:
+1. Get the user's Airtable base ID
+2. Search for Hot/Warm leads without personalized content
+3. Collect the record IDs and company insights of all found leads
+4. Make one `batch` call with a generate_email_opener and a generate_subject_line
+   invocation per lead
+5. Make one `batch` call with an update_lead invocation per lead that stores the
+   personalized content
+{send_email_step}6. Provide a summary of personalization results
+
+User ID: {user_id}
+Sender Email: {sender_email}
+Send Emails: {send_emails}
+"""
+
+_SEND_EMAIL_STEP = "   and a send_email invocation per lead to send the email\n"
+
+
+# MCP tool modules and the environment variables each one needs; adding a
+# tool module only takes a new row here. mcp_tools.supabase_client is left out
+# because tokens reach tools through inject_tool_credentials, not the model
+_MCP_TOOL_SPECS = (
+    ("mcp_tools.azure_logic_app", ("AZURE_LOGIC_APP_URL",)),
+    ("mcp_tools.hunter_io", ("HUNTER_API_KEY",)),
+    ("mcp_tools.airtable_crm", ("SUPABASE_URL", "SUPABASE_KEY")),
+    ("mcp_tools.gmail_sender", ()),
+    ("mcp_tools.web_scraper", ()),
+    ("mcp_tools.openai_client", ("OPENAI_API_KEY",)),
+)
+
+
+def _mcp_tool(modules, env_keys=(), timeout=60) -> MCPToolset:
+    """MCP toolset serving the given tool modules from one stdio server process"""
+    return MCPToolset(
         connection_params=StdioConnectionParams(
             server_params=StdioServerParameters(
                 command="python",
-                args=["-m", "mcp_tools.supabase_client"],
-                env={
-                    "SUPABASE_URL": os.getenv("SUPABASE_URL", ""),
-                    "SUPABASE_KEY": os.getenv("SUPABASE_KEY", ""),
-                },
+                args=["-m", "mcp_tools", *modules],
+                env={key: os.getenv(key, "") for key in env_keys},
             ),
-            timeout=60,
+            timeout=timeout,
         ),
     )
 
-    mcp_tools.append(supabase_tool)
 
-    # Create the root agent
-    root_agent = Agent(
+# All tool modules are served by a single stdio server process
+# (mcp_tools/__main__.py), built once at import and shared by every agent
+_MCP_TOOLS = (
+    _mcp_tool(
+        [module for module, _ in _MCP_TOOL_SPECS],
+        [key for _, env_keys in _MCP_TOOL_SPECS for key in env_keys],
+    ),
+)
+
+
+def create_root_agent() -> Agent:
+    """Create the root orchestrator agent with all MCP tools"""
+    return Agent(
         model="gemini-2.5-flash",
         name="sales_automation_root_agent",
         instruction=get_root_agent_instructions(),
-        tools=mcp_tools,
+        tools=list(_MCP_TOOLS),
+        before_tool_callback=inject_tool_credentials,
     )
 
-    return root_agent
-
 
 class SalesAutomationOrchestrator:
     """Main orchestrator for sales automation workflows"""
@@ -144,13 +283,49 @@ class SalesAutomationOrchestrator:
             app_name="sales_automation",
             session_service=session_service,
         )
+        self.genai_client = genai.Client()
+        # Conversation session per user, resolved lazily and dropped on errors
+        self._session_cache: Dict[str, Any] = {}
+        # Caps concurrent requests per user so one user cannot starve others;
+        # user_id -> [semaphore, requests holding or awaiting it], dropped when
+        # the user has no requests left
+        self._user_limits: Dict[str, list] = {}
+        # (user_id, message) -> (parsed at, task_info), oldest first
+        self._parse_cache: OrderedDict[tuple[str, str], tuple[float, dict]] = (
+            OrderedDict()
+        )
 
     async def process_request(
         self, user_id: str, message: str, user_email: str = None
     ) -> AgentResponse:
         """Process a user request and route to appropriate workflow"""
+        # Greetings are answered without credentials lookup or parsing
+        if is_greeting(message):
+            return AgentResponse(
+                success=True, message=CONVERSATIONAL_RESPONSE, leads_processed=0
+            )
+
+        limit = self._user_limits.get(user_id)
+        if limit is None:
+            limit = self._user_limits[user_id] = [
+                asyncio.Semaphore(MAX_CONCURRENT_REQUESTS_PER_USER),
+                0,
+            ]
+        limit[1] += 1
+        try:
+            async with limit[0]:
+                return await self._process_request(user_id, message, user_email)
+        finally:
+            limit[1] -= 1
+            if not limit[1]:
+                del self._user_limits[user_id]
+
+    async def _process_request(
+        self, user_id: str, message: str, user_email: str = None
+    ) -> AgentResponse:
+        """Process a user request once it has a concurrency slot"""
         try:
-            logger.info(f"Processing request from user {user_id}: {message}")
+            logger.info("Processing request from user %s: %s", user_id, message)
 
             # Get user credentials
             credentials = await oauth_manager.get_user_credentials(user_id)
@@ -196,7 +371,7 @@ class SalesAutomationOrchestrator:
                 return await self._handle_single_task(task_info, user_id, credentials)
 
         except Exception as e:
-            logger.error(f"Error processing request: {e}")
+            logger.error("Error processing request: %s", e)
             return AgentResponse(
                 success=False,
                 message=f"An error occurred while processing your request: {str(e)}",
@@ -205,105 +380,127 @@ class SalesAutomationOrchestrator:
 
     async def _get_or_create_session(self, user_id: str):
         """Get existing session for user or create a new one if none exists"""
+        # Reuse the session resolved earlier in this process
+        session = self._session_cache.get(user_id)
+        if session is not None:
+            return session
+
         try:
-            # First, try to get existing sessions for this user
-            list_response = await session_service.list_sessions(
+            # Each user has one conversation session under a fixed ID, so it is
+            # fetched directly instead of listing all of the user's sessions
+            session = await session_service.get_session(
                 app_name="sales_automation",
                 user_id=user_id,
+                session_id=CONVERSATION_SESSION_ID,
+                config=_SESSION_LOOKUP_CONFIG,
             )
 
-            # If sessions exist, use the most recent one (last in the list)
-            if list_response.sessions:
+            if session is None:
                 logger.info(
-                    f"Found {len(list_response.sessions)} existing sessions for user {user_id}"
+                    "No existing session found for user %s, creating new session",
+                    user_id,
+                )
+                session = await session_service.create_session(
+                    app_name="sales_automation",
+                    user_id=user_id,
+                    session_id=CONVERSATION_SESSION_ID,
                 )
-                # Return the most recent session (sessions are typically ordered by creation time)
-                return list_response.sessions[-1]
 
-            # No existing sessions, create a new one
-            logger.info(
-                f"No existing sessions found for user {user_id}, creating new session"
+        except Exception as e:
+            logger.error(
+                "Error getting or creating session for user %s: %s", user_id, e
             )
+            # Fallback to creating a new session
             session = await session_service.create_session(
                 app_name="sales_automation",
                 user_id=user_id,
             )
-            return session
 
-        except Exception as e:
-            logger.error(f"Error getting or creating session for user {user_id}: {e}")
-            # Fallback to creating a new session
-            return await session_service.create_session(
-                app_name="sales_automation",
-                user_id=user_id,
-            )
+        self._session_cache[user_id] = session
+        return session
 
-    async def _run_agent_with_prompt(self, prompt: str, user_id: str) -> str:
+    async def _create_task_session(self, user_id: str, task_type: str):
+        """Create a dedicated session for one run of a concurrently running task"""
+        return await session_service.create_session(
+            app_name="sales_automation",
+            user_id=user_id,
+            session_id=f"{TASK_SESSION_PREFIX}{task_type}-{uuid.uuid4().hex}",
+        )
+
+    async def _run_agent_with_prompt(
+        self,
+        prompt: str,
+        user_id: str,
+        credentials: Optional[Dict[str, Any]] = None,
+    ) -> str:
         """Helper method to run agent with a prompt and return response"""
         try:
-            # Get or create a session for this user
-            session = await self._get_or_create_session(user_id)
+            # Use the task's own session when running concurrently, otherwise
+            # get or create a session for this user
+            session = _task_session.get() or await self._get_or_create_session(user_id)
 
             # Create content object for the runner
-            from google.genai import types
-
             content = types.Content(
                 role="user",
                 parts=[types.Part.from_text(text=prompt)],
             )
 
-            # Use the agent to run the prompt
-            events = []
+            # Use the agent to run the prompt, keeping only the last text response
+            response = ""
             async for event in self.runner.run_async(
                 user_id=user_id,
                 session_id=session.id,
                 new_message=content,
+                state_delta=get_credential_state(credentials) if credentials else None,
             ):
-                events.append(event)
+                response = get_event_text(event) or response
 
-            # Get the last response from events
-            response = ""
-            for event in events:
-                if hasattr(event, "content") and event.content and event.content.parts:
-                    # Extract text from all parts
-                    text_parts = []
-                    for part in event.content.parts:
-                        if hasattr(part, "text") and part.text:
-                            text_parts.append(part.text)
-                    if text_parts:
-                        response = " ".join(text_parts)
-
-            logger.info(f"Response from agent: {response}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Response from agent: %s", response)
             return response
 
         except Exception as e:
-            logger.error(f"Error running agent with prompt: {e}")
+            logger.error("Error running agent with prompt: %s", e)
+            # Re-resolve the session on the next call in case it went stale
+            self._session_cache.pop(user_id, None)
             return ""
 
     async def _parse_user_request(
         self, message: str, user_id: str
     ) -> Optional[Dict[str, Any]]:
         """Parse user request to extract task information"""
-        try:
-            from .prompts import get_task_parsing_prompt
+        if len(message) < MAX_CONVERSATIONAL_LENGTH and not _TASK_KEYWORDS_RE.search(
+            message
+        ):
+            return {"task": None, "response": CONVERSATIONAL_RESPONSE}
 
-            parsing_prompt = f"""
-            {get_task_parsing_prompt()}
-            
-            User request: "{message}"
-            User ID: {user_id}
-            """
+        cache_key = (user_id, message)
+        cached = self._parse_cache.get(cache_key)
+        if cached and time.monotonic() - cached[0] < PARSE_CACHE_TTL:
+            self._parse_cache.move_to_end(cache_key)
+            return dict(cached[1])
 
-            # Use the agent to parse the request
-            response = await self._run_agent_with_prompt(parsing_prompt, user_id)
+        try:
+            # Ask the parser model for the task JSON
+            response = await self.genai_client.aio.models.generate_content(
+                model=TASK_PARSER_MODEL,
+                contents=f'User request: "{message}"\nUser ID: {user_id}',
+                config=_TASK_PARSER_CONFIG,
+            )
 
             # Extract JSON from response
-            task_info = extract_json_from_text(response)
+            task_info = extract_json_from_text(response.text or "")
+
+            if task_info:
+                self._parse_cache[cache_key] = (time.monotonic(), dict(task_info))
+                self._parse_cache.move_to_end(cache_key)
+                if len(self._parse_cache) > PARSE_CACHE_SIZE:
+                    self._parse_cache.popitem(last=False)
 
             return task_info
 
         except Exception as e:
-            logger.error(f"Error parsing user request: {e}")
+            logger.error("Error parsing user request: %s", e)
             return None
 
     async def _handle_single_task(
@@ -330,17 +527,29 @@ class SalesAutomationOrchestrator:
     async def _handle_multiple_tasks(
         self, task_info: Dict[str, Any], user_id: str, credentials: Dict[str, Any]
     ) -> AgentResponse:
-        """Handle multiple tasks in sequence"""
+        """Handle multiple tasks, running independent tasks concurrently"""
         tasks = task_info.get("task", [])
         results = []
-        errors = []
 
-        for task_type in tasks:
-            task_result = await self._handle_single_task(
-                {**task_info, "task": task_type}, user_id, credentials
-            )
+        for stage in group_task_stages(tasks):
+            if len(stage) == 1:
+                results.append(
+                    await self._run_task(task_info, stage[0], user_id, credentials)
+                )
+            else:
+                results.extend(
+                    await asyncio.gather(
+                        *[
+                            self._run_task(
+                                task_info, task_type, user_id, credentials, True
+                            )
+                            for task_type in stage
+                        ]
+                    )
+                )
 
-            results.append(task_result)
+        errors = []
+        for task_result in results:
             if not task_result.success:
                 errors.extend(task_result.errors or [])
 
@@ -353,9 +562,43 @@ class SalesAutomationOrchestrator:
             message=f"Completed {success_count}/{len(tasks)} tasks successfully. Processed {total_leads} leads total.",
             leads_processed=total_leads,
             errors=errors if errors else None,
-            data={"task_results": [r.dict() for r in results]},
+            data={"task_results": [r.model_dump(exclude_none=True) for r in results]},
         )
 
+    async def _run_task(
+        self,
+        task_info: Dict[str, Any],
+        task_type: str,
+        user_id: str,
+        credentials: Dict[str, Any],
+        concurrent: bool = False,
+    ) -> AgentResponse:
+        """Run one task of a multi-task request, converting errors to a response"""
+        task_session = None
+        try:
+            if concurrent:
+                task_session = await self._create_task_session(user_id, task_type)
+                _task_session.set(task_session)
+
+            return await self._handle_single_task(
+                {**task_info, "task": task_type}, user_id, credentials
+            )
+
+        except Exception as e:
+            logger.error("Error running %s task: %s", task_type, e)
+            return AgentResponse(
+                success=False,
+                message=f"Task {task_type} failed: {str(e)}",
+                errors=[str(e)],
+            )
+        finally:
+            if task_session is not None:
+                await session_service.delete_session(
+                    app_name="sales_automation",
+                    user_id=user_id,
+                    session_id=task_session.id,
+                )
+
     async def _handle_prospecting(
         self, task_info: Dict[str, Any], user_id: str, credentials: Dict[str, Any]
     ) -> AgentResponse:
@@ -383,18 +626,13 @@ class SalesAutomationOrchestrator:
             query = f"Find {num_companies} companies " + " ".join(query_parts)
 
             # Use agent to execute prospecting
-            prospecting_prompt = f"""
-            Execute a prospecting workflow:
-            1. Use the Azure Logic App tool to search for companies with this query: "{query}"
-            2. Get the user's Airtable base ID using access token: {airtable_creds['access_token']}
-            3. Parse and structure the company data
-            4. Create lead records in the user's Airtable CRM
-            5. Provide a summary of results
-            
-            User ID: {user_id}
-            """
-
-            response = await self._run_agent_with_prompt(prospecting_prompt, user_id)
+            prospecting_prompt = _PROSPECTING_PROMPT.format(
+                query=query, user_id=user_id
+            )
+
+            response = await self._run_agent_with_prompt(
+                prospecting_prompt, user_id, credentials
+            )
 
             return AgentResponse(
                 success=True,
@@ -404,7 +642,7 @@ class SalesAutomationOrchestrator:
             )
 
         except Exception as e:
-            logger.error(f"Error in prospecting workflow: {e}")
+            logger.error("Error in prospecting workflow: %s", e)
             return AgentResponse(
                 success=False, message=f"Prospecting failed: {str(e)}", errors=[str(e)]
             )
@@ -423,28 +661,18 @@ class SalesAutomationOrchestrator:
                     errors=["No Airtable credentials"],
                 )
 
-            enrichment_prompt = f"""
-            Execute an enrichment workflow:
-            1. Get the user's Airtable base ID using access token: {airtable_creds['access_token']}
-            2. Search for unenriched leads (Enriched = false or empty)
-            3. For each lead with a website:
-               - Use Hunter.io to find email addresses
-               - Use web scraper to extract company information and insights
-               - Update the lead record with enriched data
-            4. Mark leads as enriched
-            5. Provide a summary of enrichment results
-            
-            User ID: {user_id}
-            """
-
-            response = await self._run_agent_with_prompt(enrichment_prompt, user_id)
+            enrichment_prompt = _ENRICHMENT_PROMPT.format(user_id=user_id)
+
+            response = await self._run_agent_with_prompt(
+                enrichment_prompt, user_id, credentials
+            )
 
             return AgentResponse(
                 success=True, message=response, data={"task_type": "enrichment"}
             )
 
         except Exception as e:
-            logger.error(f"Error in enrichment workflow: {e}")
+            logger.error("Error in enrichment workflow: %s", e)
             return AgentResponse(
                 success=False, message=f"Enrichment failed: {str(e)}", errors=[str(e)]
             )
@@ -462,28 +690,18 @@ class SalesAutomationOrchestrator:
                     errors=["No Airtable credentials"],
                 )
 
-            qualification_prompt = f"""
-            Execute a lead qualification workflow:
-            1. Get the user's Airtable base ID using access token: {airtable_creds['access_token']}
-            2. Get the user's ICP (Ideal Customer Persona) from the Personas table for user: {user_id}
-            3. Search for enriched leads without scores (Enriched = true AND Score = empty)
-            4. For each lead:
-               - Use OpenAI to score the lead against ICP criteria
-               - Parse the scoring results (Hot/Warm/Cold + reasoning)
-               - Update the lead record with score and reasoning
-            5. Provide a summary with score distribution
-            
-            User ID: {user_id}
-            """
-
-            response = await self._run_agent_with_prompt(qualification_prompt, user_id)
+            qualification_prompt = _QUALIFICATION_PROMPT.format(user_id=user_id)
+
+            response = await self._run_agent_with_prompt(
+                qualification_prompt, user_id, credentials
+            )
 
             return AgentResponse(
                 success=True, message=response, data={"task_type": "qualification"}
             )
 
         except Exception as e:
-            logger.error(f"Error in qualification workflow: {e}")
+            logger.error("Error in qualification workflow: %s", e)
             return AgentResponse(
                 success=False,
                 message=f"Qualification failed: {str(e)}",
@@ -513,24 +731,21 @@ class SalesAutomationOrchestrator:
                     errors=["No Gmail credentials"],
                 )
 
-            personalization_prompt = f"""
-            Execute an email personalization workflow:
-            1. Get the user's Airtable base ID using access token: {airtable_creds['access_token']}
-            2. Search for Hot/Warm leads without personalized content
-            3. For each lead:
-               - Use OpenAI to generate a personalized email opener based on company insights
-               - Use OpenAI to generate a compelling subject line
-               - Update the lead record with personalized content
-               {"- Send the email using Gmail API with access token: " + gmail_creds['access_token'] if send_emails and gmail_creds else ""}
-            4. Provide a summary of personalization results
-            
-            User ID: {user_id}
-            Sender Email: {gmail_creds.get('provider_email', 'user@example.com') if gmail_creds else 'user@example.com'}
-            Send Emails: {send_emails}
-            """
+            personalization_prompt = _PERSONALIZATION_PROMPT.format(
+                user_id=user_id,
+                send_email_step=(
+                    _SEND_EMAIL_STEP if send_emails and gmail_creds else ""
+                ),
+                sender_email=(
+                    gmail_creds.get("provider_email", "user@example.com")
+                    if gmail_creds
+                    else "user@example.com"
+                ),
+                send_emails=send_emails,
+            )
 
             response = await self._run_agent_with_prompt(
-                personalization_prompt, user_id
+                personalization_prompt, user_id, credentials
             )
 
             return AgentResponse(
@@ -540,7 +755,7 @@ class SalesAutomationOrchestrator:
             )
 
         except Exception as e:
-            logger.error(f"Error in personalization workflow: {e}")
+            logger.error("Error in personalization workflow: %s", e)
             return AgentResponse(
                 success=False,
                 message=f"Personalization failed: {str(e)}",
@@ -548,7 +763,27 @@ class SalesAutomationOrchestrator:
             )
 
 
-# Global orchestrator instance
-sales_orchestrator = SalesAutomationOrchestrator()
-runner = sales_orchestrator.runner
-root_agent = sales_orchestrator.agent
+# Global orchestrator instance, created on first use
+_orchestrator: Optional[SalesAutomationOrchestrator] = None
+_orchestrator_lock = threading.Lock()
+
+
+def get_orchestrator() -> SalesAutomationOrchestrator:
+    """Get the global orchestrator, creating it on first call"""
+    global _orchestrator
+    if _orchestrator is None:
+        with _orchestrator_lock:
+            if _orchestrator is None:
+                _orchestrator = SalesAutomationOrchestrator()
+    return _orchestrator
+
+
+def __getattr__(name: str) -> Any:
+    """Resolve the orchestrator globals lazily (PEP 562)"""
+    if name == "sales_orchestrator":
+        return get_orchestrator()
+    if name == "runner":
+        return get_orchestrator().runner
+    if name == "root_agent":
+        return get_orchestrator().agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,7 +2,10 @@
 Prompts and instructions for the Sales Automation Agents
 """
 
+from functools import lru_cache
 
+
+@lru_cache(maxsize=1)
 def get_root_agent_instructions() -> str:
     """Instructions for the root orchestrator agent"""
     return """
@@ -22,7 +25,6 @@ Available workflows:
 - **Personalization**: Generate personalized email content and send emails
 
 You have access to these tools via MCP:
-- Supabase for user credential management (OAuth tokens, profiles)
 - Azure Logic App for lead discovery so whenever you need to find leads, you can use this tool and store them in Airtable CRM
 - When creating leads no need to add Score field as this step will be happen in Qualify/Qualification task. 
 - Hunter.io for enriching the domains and update the data to Airtable CRM.
@@ -42,9 +44,11 @@ You have access to these tools via MCP:
  4. then you have to update the lead's `Personalized Opener`  field in Airtable CRM.
  5. then you have to provide a summary of the personalization results.
 - OpenAI for AI-powered analysis and content generation so whenever you need to generate any content, you can use this tool to generate the content.
+- The `batch` tool runs many tool calls at once. Whenever the same tool is needed for several leads, gather all the leads first and make one `batch` call with one invocation per lead instead of calling the tool lead by lead.
 
 Always:
-- Start with extracting user credentials using the Supabase tool (get_oauth_connection) without asking for user ID as it is already in the state
+- Airtable and Gmail access tokens are filled into tool calls automatically from the session state, so pass "session" as the access_token argument instead of fetching or repeating a token
+- If a tool reports a missing or invalid access token, ask the user to reconnect that account instead of retrying
 - Provide clear progress updates
 - Give specific, actionable feedback
 - Ask for clarification when requests are ambiguous
@@ -59,6 +63,7 @@ Example interactions:
 """
 
 
+@lru_cache(maxsize=1)
 def get_prospecting_agent_instructions() -> str:
     """Instructions for the prospecting agent"""
     return """
@@ -93,6 +98,7 @@ Always provide clear feedback about:
 """
 
 
+@lru_cache(maxsize=1)
 def get_enrichment_agent_instructions() -> str:
     """Instructions for the enrichment agent"""
     return """
@@ -106,14 +112,13 @@ Your responsibilities:
 5. Update leads in user's CRM with enriched data
 
 Enrichment process:
-1. Get unenriched leads from user's CRM
-2. For each lead with a website:
-   - Find emails using Hunter.io domain search
-   - Scrape company website for content
-   - Extract key insights and background info
-   - Look for LinkedIn profiles and social media
-3. Update CRM with enriched data
-4. Mark leads as enriched
+1. Get unenriched leads from user's CRM and collect every lead's ID and website
+2. Make one `batch` call covering all leads with a website:
+   - A find_emails invocation per domain (Hunter.io domain search)
+   - An extract_company_info invocation per website for insights and background info
+3. Look for LinkedIn profiles and social media in the results
+4. Make one `batch` call with an update_lead invocation per lead to store the
+   enriched data and mark the lead as enriched
 
 Data to gather:
 - Primary contact email (verified)
@@ -138,6 +143,7 @@ Provide detailed feedback on:
 """
 
 
+@lru_cache(maxsize=1)
 def get_scoring_agent_instructions() -> str:
     """Instructions for the scoring agent"""
     return """
@@ -164,13 +170,13 @@ Rating system:
 Process:
 1. Get user's ICP from Personas table
 2. Retrieve enriched leads without scores
-3. For each lead, analyze against ICP:
+3. Make one `batch` call with a score_lead invocation per lead against the ICP:
    - Compare industry and company size
    - Look for use case alignment in background
    - Identify pain point matches
 4. Calculate numerical score and assign rating
 5. Generate clear reasoning
-6. Update CRM with results
+6. Make one `batch` call with an update_lead invocation per lead to store the results
 
 Provide comprehensive feedback:
 - Total leads scored
@@ -180,6 +186,7 @@ Provide comprehensive feedback:
 """
 
 
+@lru_cache(maxsize=1)
 def get_personalization_agent_instructions() -> str:
     """Instructions for the personalization agent"""
     return """
@@ -230,6 +237,7 @@ Provide detailed feedback:
 """
 
 
+@lru_cache(maxsize=1)
 def get_task_parsing_prompt() -> str:
     """Prompt for parsing user tasks"""
     return """
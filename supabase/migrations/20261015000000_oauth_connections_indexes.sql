@@ -0,0 +1,16 @@
+-- Indexes for the oauth_connections queries in utils/supabase_client.py.
+-- On a large live table, run each statement by hand with CREATE INDEX
+-- CONCURRENTLY instead, outside a transaction.
+
+-- Lookups by user_id, or by user_id and provider, among active connections.
+-- Covers every selected column, so these are served by index-only scans.
+CREATE INDEX IF NOT EXISTS oauth_active_lookup
+    ON oauth_connections (user_id, provider)
+    INCLUDE (provider_email, access_token, refresh_token, token_expires_at,
+             is_active, created_at, updated_at)
+    WHERE is_active;
+
+-- Background token prefetch: active connections by expiry time
+CREATE INDEX IF NOT EXISTS oauth_active_expiry
+    ON oauth_connections (token_expires_at)
+    WHERE is_active;
@@ -3,6 +3,8 @@ OAuth authentication utilities for Gmail and Airtable
 """
 
 import os
+import base64
+import asyncio
 import logging
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any
@@ -10,10 +12,26 @@ import httpx
 from dotenv import load_dotenv
 
 load_dotenv()
-from .supabase_client import supabase_client
+from .supabase_client import get_supabase_client
+from .data_models import OAuthConnection
 
 logger = logging.getLogger(__name__)
 
+# Tokens are refreshed this long before they expire, so requests never see an
+# expired token
+TOKEN_REFRESH_SKEW = timedelta(minutes=5)
+
+# Background prefetch refreshes tokens expiring within this many seconds
+PREFETCH_INTERVAL = 60
+PREFETCH_SKEW_SECONDS = 600
+MAX_CONCURRENT_PREFETCHES = 10
+# Prefetch also picks up tokens that expired this recently, e.g. while the app
+# was down, without retrying revoked refresh tokens forever
+PREFETCH_LOOKBACK = timedelta(minutes=10)
+
+# Connection pool limits for the shared token endpoint client
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=100)
+
 
 class OAuthManager:
     """Manages OAuth token refresh for Gmail and Airtable"""
@@ -23,48 +41,91 @@ class OAuthManager:
         self.gmail_client_secret = os.getenv("GMAIL_CLIENT_SECRET")
         self.airtable_client_id = os.getenv("AIRTABLE_CLIENT_ID")
         self.airtable_client_secret = os.getenv("AIRTABLE_CLIENT_SECRET")
+        # Airtable uses Basic Auth with base64 encoded client_id:client_secret,
+        # which is constant for the process
+        airtable_auth = base64.b64encode(
+            f"{self.airtable_client_id}:{self.airtable_client_secret}".encode("ascii")
+        ).decode("ascii")
+        self._airtable_token_headers = {
+            "Content-Type": "application/x-www-form-urlencoded",
+            "Authorization": f"Basic {airtable_auth}",
+        }
+        # Shared client for token refreshes, opened in startup()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._prefetch_task: Optional[asyncio.Task] = None
+        # Serializes refreshes of one user's token so concurrent requests
+        # share a single refresh; (user_id, provider) -> [lock, callers holding
+        # or awaiting it], dropped when no caller is left
+        self._refresh_locks: Dict[tuple[str, str], list] = {}
+
+    async def startup(self, prefetch: bool = False):
+        """Open the shared HTTP client and optionally start token prefetching"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=HTTP_LIMITS, timeout=30.0, http2=True
+            )
+        if prefetch and self._prefetch_task is None:
+            self._prefetch_task = asyncio.create_task(self._prefetch_loop())
+
+    async def shutdown(self):
+        """Stop token prefetching and close the shared HTTP client"""
+        if self._prefetch_task is not None:
+            self._prefetch_task.cancel()
+            try:
+                await self._prefetch_task
+            except asyncio.CancelledError:
+                pass
+            self._prefetch_task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        """Shared HTTP client, opened on first use outside the app lifespan"""
+        if self._client is None:
+            await self.startup()
+        return self._client
 
     async def refresh_gmail_token(
         self, user_id: str, refresh_token: str
     ) -> Optional[Dict[str, Any]]:
         """Refresh Gmail OAuth token"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    "https://oauth2.googleapis.com/token",
-                    data={
-                        "grant_type": "refresh_token",
-                        "refresh_token": refresh_token,
-                        "client_id": self.gmail_client_id,
-                        "client_secret": self.gmail_client_secret,
-                    },
+            client = await self._get_client()
+            response = await client.post(
+                "https://oauth2.googleapis.com/token",
+                data={
+                    "grant_type": "refresh_token",
+                    "refresh_token": refresh_token,
+                    "client_id": self.gmail_client_id,
+                    "client_secret": self.gmail_client_secret,
+                },
+            )
+
+            if response.status_code == 200:
+                token_data = response.json()
+
+                # Update tokens in Supabase
+                supabase_client = await get_supabase_client()
+                success = await supabase_client.update_oauth_tokens(
+                    user_id=user_id,
+                    provider="gmail",
+                    access_token=token_data["access_token"],
+                    refresh_token=token_data.get("refresh_token", refresh_token),
+                    expires_in=token_data.get("expires_in", 3600),
                 )
 
-                if response.status_code == 200:
-                    token_data = response.json()
-
-                    # Update tokens in Supabase
-                    success = await supabase_client.update_oauth_tokens(
-                        user_id=user_id,
-                        provider="gmail",
-                        access_token=token_data["access_token"],
-                        refresh_token=token_data.get("refresh_token", refresh_token),
-                        expires_in=token_data.get("expires_in", 3600),
-                    )
-
-                    if success:
-                        return {
-                            "access_token": token_data["access_token"],
-                            "refresh_token": token_data.get(
-                                "refresh_token", refresh_token
-                            ),
-                            "expires_in": token_data.get("expires_in", 3600),
-                        }
+                if success:
+                    return {
+                        "access_token": token_data["access_token"],
+                        "refresh_token": token_data.get("refresh_token", refresh_token),
+                        "expires_in": token_data.get("expires_in", 3600),
+                    }
 
-                logger.error(
-                    f"Failed to refresh Gmail token for user {user_id}: {response.text}"
-                )
-                return None
+            logger.error(
+                f"Failed to refresh Gmail token for user {user_id}: {response.text}"
+            )
+            return None
 
         except Exception as e:
             logger.error(f"Error refreshing Gmail token for user {user_id}: {e}")
@@ -75,120 +136,205 @@ class OAuthManager:
     ) -> Optional[Dict[str, Any]]:
         """Refresh Airtable OAuth token"""
         try:
-            # Airtable uses Basic Auth with base64 encoded client_id:client_secret
-            import base64
-
-            auth_string = f"{self.airtable_client_id}:{self.airtable_client_secret}"
-            auth_bytes = auth_string.encode("ascii")
-            auth_b64 = base64.b64encode(auth_bytes).decode("ascii")
-
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    "https://airtable.com/oauth2/v1/token",
-                    headers={
-                        "Content-Type": "application/x-www-form-urlencoded",
-                        "Authorization": f"Basic {auth_b64}",
-                    },
-                    data={
-                        "grant_type": "refresh_token",
-                        "refresh_token": refresh_token,
-                    },
+            client = await self._get_client()
+            response = await client.post(
+                "https://airtable.com/oauth2/v1/token",
+                headers=self._airtable_token_headers,
+                data={
+                    "grant_type": "refresh_token",
+                    "refresh_token": refresh_token,
+                },
+            )
+
+            if response.status_code == 200:
+                token_data = response.json()
+
+                # Update tokens in Supabase
+                supabase_client = await get_supabase_client()
+                success = await supabase_client.update_oauth_tokens(
+                    user_id=user_id,
+                    provider="airtable",
+                    access_token=token_data["access_token"],
+                    refresh_token=token_data.get("refresh_token", refresh_token),
+                    expires_in=token_data.get("expires_in", 3600),
                 )
 
-                if response.status_code == 200:
-                    token_data = response.json()
-
-                    # Update tokens in Supabase
-                    success = await supabase_client.update_oauth_tokens(
-                        user_id=user_id,
-                        provider="airtable",
-                        access_token=token_data["access_token"],
-                        refresh_token=token_data.get("refresh_token", refresh_token),
-                        expires_in=token_data.get("expires_in", 3600),
-                    )
-
-                    if success:
-                        return {
-                            "access_token": token_data["access_token"],
-                            "refresh_token": token_data.get(
-                                "refresh_token", refresh_token
-                            ),
-                            "expires_in": token_data.get("expires_in", 3600),
-                        }
+                if success:
+                    return {
+                        "access_token": token_data["access_token"],
+                        "refresh_token": token_data.get("refresh_token", refresh_token),
+                        "expires_in": token_data.get("expires_in", 3600),
+                    }
 
-                logger.error(
-                    f"Failed to refresh Airtable token for user {user_id}: {response.text}"
-                )
-                return None
+            logger.error(
+                f"Failed to refresh Airtable token for user {user_id}: {response.text}"
+            )
+            return None
 
         except Exception as e:
             logger.error(f"Error refreshing Airtable token for user {user_id}: {e}")
             return None
 
-    async def get_valid_token(self, user_id: str, provider: str) -> Optional[str]:
+    async def get_valid_token(
+        self,
+        user_id: str,
+        provider: str,
+        connection: Optional[OAuthConnection] = None,
+    ) -> Optional[str]:
         """Get a valid access token, refreshing if necessary"""
-        connection = await supabase_client.get_oauth_connection(user_id, provider)
+        if connection is None:
+            supabase_client = await get_supabase_client()
+            connection = await supabase_client.get_oauth_connection(user_id, provider)
+
+        if not connection:
+            logger.warning(f"No {provider} connection found for user {user_id}")
+            return None
+
+        # Refresh tokens that expire within the skew window
+        if (
+            datetime.now(timezone.utc) + TOKEN_REFRESH_SKEW
+            >= connection.token_expires_at
+        ):
+            return await self._refresh_token(user_id, provider, TOKEN_REFRESH_SKEW)
 
+        return connection.access_token
+
+    async def _refresh_token(
+        self, user_id: str, provider: str, skew: timedelta
+    ) -> Optional[str]:
+        """Refresh a token expiring within skew, once across concurrent callers"""
+        key = (user_id, provider)
+        entry = self._refresh_locks.get(key)
+        if entry is None:
+            entry = self._refresh_locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                return await self._refresh_token_locked(user_id, provider, skew)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._refresh_locks[key]
+
+    async def _refresh_token_locked(
+        self, user_id: str, provider: str, skew: timedelta
+    ) -> Optional[str]:
+        """Refresh a token under its refresh lock unless another caller did"""
+        # Another request may have refreshed the token while this one
+        # was waiting for the lock
+        supabase_client = await get_supabase_client()
+        connection, needs_refresh = await supabase_client.get_valid_oauth_connection(
+            user_id, provider, skew.total_seconds()
+        )
         if not connection:
             logger.warning(f"No {provider} connection found for user {user_id}")
             return None
+        if not needs_refresh:
+            return connection.access_token
 
-        # Check if token is expired
-        if datetime.now(timezone.utc) >= connection.token_expires_at:
-            logger.info(
-                f"Token expired for user {user_id}, provider {provider}. Refreshing..."
+        logger.info(
+            f"Token expiring for user {user_id}, provider {provider}. Refreshing..."
+        )
+
+        if provider == "gmail":
+            token_data = await self.refresh_gmail_token(
+                user_id, connection.refresh_token
+            )
+        elif provider == "airtable":
+            token_data = await self.refresh_airtable_token(
+                user_id, connection.refresh_token
             )
+        else:
+            logger.error(f"Unknown provider: {provider}")
+            return None
 
-            if provider == "gmail":
-                token_data = await self.refresh_gmail_token(
-                    user_id, connection.refresh_token
-                )
-            elif provider == "airtable":
-                token_data = await self.refresh_airtable_token(
-                    user_id, connection.refresh_token
-                )
-            else:
-                logger.error(f"Unknown provider: {provider}")
-                return None
+        if token_data:
+            return token_data["access_token"]
+        else:
+            logger.error(
+                f"Failed to refresh token for user {user_id}, provider {provider}"
+            )
+            return None
 
-            if token_data:
-                return token_data["access_token"]
-            else:
-                logger.error(
-                    f"Failed to refresh token for user {user_id}, provider {provider}"
-                )
-                return None
+    async def prefetch_expiring(self, skew_seconds: int = PREFETCH_SKEW_SECONDS):
+        """Refresh every token that expires within skew_seconds or expired lately"""
+        skew = timedelta(seconds=skew_seconds)
+        now = datetime.now(timezone.utc)
+        supabase_client = await get_supabase_client()
+        connections = await supabase_client.get_expiring_oauth_connections(
+            now + skew, now - PREFETCH_LOOKBACK
+        )
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_PREFETCHES)
+
+        async def refresh(connection: OAuthConnection):
+            async with semaphore:
+                await self._refresh_token(connection.user_id, connection.provider, skew)
+
+        await asyncio.gather(
+            *(refresh(connection) for connection in connections),
+            return_exceptions=True,
+        )
+
+    async def _prefetch_loop(self):
+        """Periodically refresh tokens before requests find them expiring"""
+        while True:
+            try:
+                await self.prefetch_expiring()
+            except Exception as e:
+                logger.error(f"Error prefetching expiring tokens: {e}")
+            await asyncio.sleep(PREFETCH_INTERVAL)
+
+    async def _load_provider(
+        self, user_id: str, provider: str, connection: Optional[OAuthConnection]
+    ) -> Optional[Dict[str, Any]]:
+        """Valid credentials for one provider, or None if not connected"""
+        if not connection:
+            logger.warning(f"No {provider} connection found for user {user_id}")
+            return None
 
-        return connection.access_token
+        access_token = await self.get_valid_token(user_id, provider, connection)
+        if not access_token:
+            return None
+
+        if access_token != connection.access_token:
+            # The token was refreshed, which may also have rotated the
+            # refresh token
+            supabase_client = await get_supabase_client()
+            connection = (
+                await supabase_client.get_oauth_connection(user_id, provider)
+                or connection
+            )
+
+        return {
+            "access_token": access_token,
+            "refresh_token": connection.refresh_token,
+            "provider_email": connection.provider_email,
+        }
 
     async def get_user_credentials(self, user_id: str) -> Dict[str, Any]:
         """Get all valid user credentials, refreshing tokens as needed"""
         credentials = {}
 
-        # Get Gmail credentials
-        gmail_token = await self.get_valid_token(user_id, "gmail")
-
-        if gmail_token:
-            gmail_connection = await supabase_client.get_oauth_connection(
-                user_id, "gmail"
-            )
-            credentials["gmail"] = {
-                "access_token": gmail_token,
-                "refresh_token": gmail_connection.refresh_token,
-                "provider_email": gmail_connection.provider_email,
-            }
-
-        # Get Airtable credentials
-        airtable_token = await self.get_valid_token(user_id, "airtable")
-        if airtable_token:
-            airtable_connection = await supabase_client.get_oauth_connection(
-                user_id, "airtable"
-            )
-            credentials["airtable"] = {
-                "access_token": airtable_token,
-                "refresh_token": airtable_connection.refresh_token,
-                "provider_email": airtable_connection.provider_email,
-            }
+        # Both connections come from one query; the providers are then
+        # validated and refreshed concurrently
+        providers = ("gmail", "airtable")
+        supabase_client = await get_supabase_client()
+        connections = await supabase_client.get_oauth_connections(user_id, providers)
+        results = await asyncio.gather(
+            *(
+                self._load_provider(user_id, provider, connections.get(provider))
+                for provider in providers
+            ),
+            return_exceptions=True,
+        )
+
+        for provider, result in zip(providers, results):
+            if isinstance(result, Exception):
+                logger.error(
+                    f"Error loading {provider} credentials for user {user_id}: {result}"
+                )
+            elif result:
+                credentials[provider] = result
 
         return credentials
 
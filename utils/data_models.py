@@ -2,12 +2,17 @@
 Data models for the Sales Automation Agent
 """
 
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
 from enum import Enum
 
 
+def _utcnow() -> datetime:
+    """Current time as a timezone-aware UTC datetime"""
+    return datetime.now(timezone.utc)
+
+
 class LeadScore(str, Enum):
     HOT = "Hot"
     WARM = "Warm"
@@ -47,8 +52,8 @@ class Lead(BaseModel):
     subject_line: Optional[str] = Field(None, description="Email subject line")
     enriched: bool = Field(False, description="Whether lead has been enriched")
     email_sent: bool = Field(False, description="Whether email has been sent")
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=_utcnow)
+    updated_at: datetime = Field(default_factory=_utcnow)
 
     # Additional enrichment fields
     funding_round: Optional[str] = Field(None, description="Recent funding information")
@@ -68,8 +73,8 @@ class ICP(BaseModel):
     job_titles: List[str] = Field(default_factory=list, description="Target job titles")
     pain_points: List[str] = Field(default_factory=list, description="Key pain points")
     use_cases: List[str] = Field(default_factory=list, description="Primary use cases")
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=_utcnow)
+    updated_at: datetime = Field(default_factory=_utcnow)
 
 
 class OAuthConnection(BaseModel):
@@ -82,8 +87,8 @@ class OAuthConnection(BaseModel):
     refresh_token: str = Field(..., description="OAuth refresh token")
     token_expires_at: datetime = Field(..., description="Token expiration time")
     is_active: bool = Field(True, description="Whether connection is active")
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=_utcnow)
+    updated_at: datetime = Field(default_factory=_utcnow)
 
 
 class User(BaseModel):
@@ -98,8 +103,8 @@ class User(BaseModel):
         None, description="Airtable OAuth credentials"
     )
     preferences: Optional[Dict[str, Any]] = Field(None, description="User preferences")
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=_utcnow)
+    updated_at: datetime = Field(default_factory=_utcnow)
 
 
 class ProspectingRequest(BaseModel):
@@ -4,14 +4,118 @@ Helper utilities for the Sales Automation Agent
 
 import uuid
 import re
+import queue
+import atexit
+from bisect import bisect_right
 import base64
 import logging
+import logging.handlers
 import json
 import os
 from typing import Dict, Any, List, Optional
+from email.message import EmailMessage
+from email.policy import SMTP
 from urllib.parse import urlparse, urljoin
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:  # orjson is an optional speedup
+    orjson = None
+
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick is an optional speedup
+    ahocorasick = None
+
+# Patterns used to pull JSON out of LLM responses
+_JSON_BLOCK_RE = re.compile(r"```json\s*(\{.*?\})\s*```", re.DOTALL)
+_JSON_DECODER = json.JSONDecoder()
+
+# Patterns used by the lead data cleaners
+_EMAIL_RE = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
+_NON_DIGIT_PLUS_RE = re.compile(r"[^\d+]")
+_NON_DIGIT_RE = re.compile(r"[^0-9]")
+_NUM_RE = re.compile(r"\d+")
+_FUNDING_RE = re.compile(r"(raised|funding|investment).*?(\$[\d.]+[kmb]?)")
+_COMPANY_SUFFIX_RE = re.compile(r"(?:\s+(?:Inc\.?|LLC|Ltd\.?|Corp\.?|Co\.?))+\s*$")
+
+# Company size buckets: sizes below _SIZE_THRESHOLDS[i] get _SIZE_LABELS[i]
+_SIZE_THRESHOLDS = (10, 50, 200, 1000, 5000)
+_SIZE_LABELS = (
+    "1-10 employees",
+    "11-50 employees",
+    "51-200 employees",
+    "201-1000 employees",
+    "1001-5000 employees",
+    "5000+ employees",
+)
+
+# Keywords that mark insights in scraped company text; growth and tech
+# keywords are checked in order, so they stay tuples
+_FUNDING_KEYWORDS = frozenset(
+    ("funding", "raised", "series", "investment", "venture", "capital")
+)
+_GROWTH_KEYWORDS = ("growing", "expansion", "expanding", "launched", "new product")
+_TECH_KEYWORDS = (
+    "ai",
+    "artificial intelligence",
+    "machine learning",
+    "cloud",
+    "saas",
+    "api",
+)
+_INDUSTRY_KEYWORDS: tuple[tuple[str, frozenset[str]], ...] = (
+    ("fintech", frozenset(("payment", "banking", "financial", "fintech"))),
+    ("healthtech", frozenset(("health", "medical", "healthcare", "patient"))),
+    ("edtech", frozenset(("education", "learning", "student", "course"))),
+    ("retail", frozenset(("retail", "ecommerce", "shopping", "consumer"))),
+)
+_ALL_KEYWORDS = frozenset(
+    (
+        *_FUNDING_KEYWORDS,
+        *_GROWTH_KEYWORDS,
+        *_TECH_KEYWORDS,
+        *(keyword for _, keywords in _INDUSTRY_KEYWORDS for keyword in keywords),
+    )
+)
+
+
+def _build_keyword_automaton():
+    """Aho-Corasick automaton over all insight keywords, if pyahocorasick is installed"""
+    if ahocorasick is None:
+        return None
+
+    automaton = ahocorasick.Automaton()
+    for keyword in _ALL_KEYWORDS:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+
+_KEYWORD_AUTOMATON = _build_keyword_automaton()
+
+
+def _find_keywords(text_lower: str) -> set:
+    """Insight keywords occurring in lowercased text, found in a single pass"""
+    if _KEYWORD_AUTOMATON is not None:
+        return {keyword for _, keyword in _KEYWORD_AUTOMATON.iter(text_lower)}
+    return {keyword for keyword in _ALL_KEYWORDS if keyword in text_lower}
+
+
+def _json_loads(text: str) -> Any:
+    """Parse JSON with orjson when available, falling back to the stdlib"""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def _json_dumps(obj: Any) -> str:
+    """Serialize compact JSON with orjson when available, falling back to the stdlib"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS, default=str).decode()
+    return json.dumps(obj, separators=(",", ":"), default=str)
+
 
 def setup_api_logger():
     """Setup logger for API interactions"""
@@ -19,23 +123,33 @@ def setup_api_logger():
     if not os.path.exists("logs"):
         os.makedirs("logs")
 
-    # Create a logger for API interactions
+    # Create a logger for API interactions; entries are logged at DEBUG, so
+    # they are only built and written when API_LOG_LEVEL=DEBUG
     api_logger = logging.getLogger("api_interactions")
-    api_logger.setLevel(logging.DEBUG)
-
-    # Create file handler
-    file_handler = logging.FileHandler("logs/api_interactions.log")
-    file_handler.setLevel(logging.DEBUG)
-
-    # Create formatter
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
-    file_handler.setFormatter(formatter)
+    api_logger.setLevel(os.getenv("API_LOG_LEVEL", "INFO").upper())
 
     # Add handler to logger if it doesn't already have it
     if not api_logger.handlers:
-        api_logger.addHandler(file_handler)
+        # Create file handler
+        file_handler = logging.FileHandler("logs/api_interactions.log")
+        file_handler.setLevel(logging.DEBUG)
+
+        # Create formatter
+        formatter = logging.Formatter(
+            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+        )
+        file_handler.setFormatter(formatter)
+
+        # Records are queued and written to the file from a background
+        # thread, so logging never blocks the event loop on disk I/O
+        log_queue = queue.Queue(-1)
+        api_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        listener = logging.handlers.QueueListener(
+            log_queue, file_handler, respect_handler_level=True
+        )
+        listener.start()
+        atexit.register(listener.stop)
+        api_logger.listener = listener
 
     return api_logger
 
@@ -50,6 +164,8 @@ def log_api_interaction(
 ):
     """Log API request and response details"""
     api_logger = logging.getLogger("api_interactions")
+    if not api_logger.isEnabledFor(logging.DEBUG):
+        return
 
     # Log full headers including auth tokens
     log_entry = {
@@ -72,7 +188,7 @@ def log_api_interaction(
             if hasattr(response, "text"):
                 try:
                     # Try to parse as JSON
-                    response_body = json.loads(response.text)
+                    response_body = _json_loads(response.text)
                     # Log full response including tokens
                     log_entry["response_body"] = response_body
                 except json.JSONDecodeError:
@@ -84,7 +200,7 @@ def log_api_interaction(
     if error:
         log_entry["error"] = str(error)
 
-    api_logger.debug(json.dumps(log_entry, indent=2))
+    api_logger.debug(_json_dumps(log_entry))
 
 
 logger = logging.getLogger(__name__)
@@ -129,8 +245,7 @@ def clean_email(email: str) -> str:
     email = email.strip().lower()
 
     # Basic email validation
-    email_pattern = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
-    if re.match(email_pattern, email):
+    if _EMAIL_RE.match(email):
         return email
 
     return ""
@@ -142,13 +257,13 @@ def clean_phone(phone: str) -> str:
         return ""
 
     # Remove all non-digit characters except + at the beginning
-    cleaned = re.sub(r"[^\d+]", "", phone)
+    cleaned = _NON_DIGIT_PLUS_RE.sub("", phone)
 
     # Ensure + is only at the beginning
     if cleaned.startswith("+"):
-        cleaned = "+" + re.sub(r"[^0-9]", "", cleaned[1:])
+        cleaned = "+" + _NON_DIGIT_RE.sub("", cleaned[1:])
     else:
-        cleaned = re.sub(r"[^0-9]", "", cleaned)
+        cleaned = _NON_DIGIT_RE.sub("", cleaned)
 
     return cleaned if len(cleaned) >= 10 else ""
 
@@ -158,15 +273,8 @@ def clean_company_name(name: str) -> str:
     if not name:
         return ""
 
-    # Remove common suffixes and clean
-    suffixes = ["Inc.", "Inc", "LLC", "Ltd.", "Ltd", "Corp.", "Corp", "Co.", "Co"]
-    cleaned = name.strip()
-
-    for suffix in suffixes:
-        if cleaned.endswith(f" {suffix}"):
-            cleaned = cleaned[: -len(suffix) - 1].strip()
-
-    return cleaned
+    # Remove common trailing suffixes and clean
+    return _COMPANY_SUFFIX_RE.sub("", name.strip()).strip()
 
 
 def parse_company_size(size_str: str) -> str:
@@ -176,44 +284,26 @@ def parse_company_size(size_str: str) -> str:
 
     size_str = size_str.strip().lower()
 
-    # Extract numbers
-    numbers = re.findall(r"\d+", size_str)
-    if not numbers:
+    # Extract the first number and map it to a standard range
+    match = _NUM_RE.search(size_str)
+    if not match:
         return size_str.title()
 
-    # Convert to standard ranges
-    num = int(numbers[0])
-    if num < 10:
-        return "1-10 employees"
-    elif num < 50:
-        return "11-50 employees"
-    elif num < 200:
-        return "51-200 employees"
-    elif num < 1000:
-        return "201-1000 employees"
-    elif num < 5000:
-        return "1001-5000 employees"
-    else:
-        return "5000+ employees"
+    return _SIZE_LABELS[bisect_right(_SIZE_THRESHOLDS, int(match.group(0)))]
 
 
 def create_email_mime(
     from_email: str, to_email: str, subject: str, body: str, is_html: bool = False
 ) -> str:
     """Create MIME email format for Gmail API"""
-    content_type = "text/html" if is_html else "text/plain"
-
-    mime_message = (
-        f"From: {from_email}\r\n"
-        f"To: {to_email}\r\n"
-        f"Subject: {subject}\r\n"
-        f'Content-Type: {content_type}; charset="UTF-8"\r\n'
-        f"\r\n"
-        f"{body}"
-    )
+    message = EmailMessage(policy=SMTP)
+    message["From"] = from_email
+    message["To"] = to_email
+    message["Subject"] = subject
+    message.set_content(body, subtype="html" if is_html else "plain", charset="utf-8")
 
     # Encode to base64
-    return base64.urlsafe_b64encode(mime_message.encode()).decode()
+    return base64.urlsafe_b64encode(bytes(message)).decode()
 
 
 def extract_insights_from_text(text: str, max_insights: int = 5) -> List[str]:
@@ -223,85 +313,82 @@ def extract_insights_from_text(text: str, max_insights: int = 5) -> List[str]:
 
     insights = []
     text_lower = text.lower()
+    found = _find_keywords(text_lower)
 
     # Look for funding information
-    funding_keywords = [
-        "funding",
-        "raised",
-        "series",
-        "investment",
-        "venture",
-        "capital",
-    ]
-    if any(keyword in text_lower for keyword in funding_keywords):
-        funding_match = re.search(
-            r"(raised|funding|investment).*?(\$[\d.]+[kmb]?)", text_lower
-        )
+    if not _FUNDING_KEYWORDS.isdisjoint(found):
+        funding_match = _FUNDING_RE.search(text_lower)
         if funding_match:
             insights.append(f"Recent funding: {funding_match.group(0)}")
 
     # Look for growth indicators
-    growth_keywords = ["growing", "expansion", "expanding", "launched", "new product"]
-    for keyword in growth_keywords:
-        if keyword in text_lower:
+    growth_keywords = [keyword for keyword in _GROWTH_KEYWORDS if keyword in found]
+    if growth_keywords:
+        # Split and lowercase the sentences once for every keyword
+        sentences = text.split(".")
+        sentences_lower = [sentence.lower() for sentence in sentences]
+        for keyword in growth_keywords:
             # Extract sentence containing the keyword
-            sentences = text.split(".")
-            for sentence in sentences:
-                if keyword in sentence.lower():
+            for sentence, sentence_lower in zip(sentences, sentences_lower):
+                if keyword in sentence_lower:
                     insights.append(f"Growth indicator: {sentence.strip()}")
                     break
 
     # Look for technology mentions
-    tech_keywords = [
-        "ai",
-        "artificial intelligence",
-        "machine learning",
-        "cloud",
-        "saas",
-        "api",
-    ]
-    for keyword in tech_keywords:
-        if keyword in text_lower:
+    for keyword in _TECH_KEYWORDS:
+        if keyword in found:
             insights.append(f"Technology focus: {keyword.upper()}")
             break
 
     # Look for industry-specific terms
-    industry_keywords = {
-        "fintech": ["payment", "banking", "financial", "fintech"],
-        "healthtech": ["health", "medical", "healthcare", "patient"],
-        "edtech": ["education", "learning", "student", "course"],
-        "retail": ["retail", "ecommerce", "shopping", "consumer"],
-    }
-
-    for industry, keywords in industry_keywords.items():
-        if any(keyword in text_lower for keyword in keywords):
+    for industry, keywords in _INDUSTRY_KEYWORDS:
+        if not keywords.isdisjoint(found):
             insights.append(f"Industry focus: {industry.title()}")
             break
 
     return insights[:max_insights]
 
 
+def prepare_icp(icp: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize an ICP once so it can be reused to score many leads"""
+    return {
+        "target_industries_lc": tuple(
+            industry.lower() for industry in icp.get("target_industries") or ()
+        ),
+        "company_size_lc": (icp.get("company_size_range") or "").lower(),
+        "use_cases_lc": tuple(
+            use_case.lower() for use_case in icp.get("use_cases") or ()
+        ),
+        "pain_points_lc": tuple(
+            pain_point.lower() for pain_point in icp.get("pain_points") or ()
+        ),
+    }
+
+
 def score_lead_against_icp(lead: Dict[str, Any], icp: Dict[str, Any]) -> Dict[str, Any]:
-    """Score a lead against ICP criteria"""
+    """Score a lead against ICP criteria, given a raw or prepare_icp() ICP"""
+    if "use_cases_lc" not in icp:
+        icp = prepare_icp(icp)
+
     score = 0
     max_score = 10
     reasoning = []
+    background_lower = (lead.get("background") or "").lower()
 
     # Industry match (3 points)
-    if lead.get("industry") and icp.get("target_industries"):
+    if lead.get("industry") and icp["target_industries_lc"]:
         lead_industry = lead["industry"].lower()
-        target_industries = [ind.lower() for ind in icp["target_industries"]]
 
-        if any(target in lead_industry for target in target_industries):
+        if any(target in lead_industry for target in icp["target_industries_lc"]):
             score += 3
             reasoning.append(f"Industry match: {lead['industry']}")
         else:
             reasoning.append(f"Industry mismatch: {lead['industry']} not in targets")
 
     # Company size match (3 points)
-    if lead.get("company_size") and icp.get("company_size_range"):
+    if lead.get("company_size") and icp["company_size_lc"]:
         # This is simplified - you'd want more sophisticated matching
-        if icp["company_size_range"].lower() in lead["company_size"].lower():
+        if icp["company_size_lc"] in lead["company_size"].lower():
             score += 3
             reasoning.append(f"Company size match: {lead['company_size']}")
         else:
@@ -309,22 +396,18 @@ def score_lead_against_icp(lead: Dict[str, Any], icp: Dict[str, Any]) -> Dict[st
             reasoning.append(f"Partial company size match: {lead['company_size']}")
 
     # Background/use case fit (2 points)
-    if lead.get("background") and icp.get("use_cases"):
-        background_lower = lead["background"].lower()
-        use_cases = [uc.lower() for uc in icp["use_cases"]]
-
-        if any(use_case in background_lower for use_case in use_cases):
-            score += 2
-            reasoning.append("Use case alignment found in company background")
+    if background_lower and any(
+        use_case in background_lower for use_case in icp["use_cases_lc"]
+    ):
+        score += 2
+        reasoning.append("Use case alignment found in company background")
 
     # Pain point fit (2 points)
-    if lead.get("background") and icp.get("pain_points"):
-        background_lower = lead["background"].lower()
-        pain_points = [pp.lower() for pp in icp["pain_points"]]
-
-        if any(pain_point in background_lower for pain_point in pain_points):
-            score += 2
-            reasoning.append("Pain point alignment found in company background")
+    if background_lower and any(
+        pain_point in background_lower for pain_point in icp["pain_points_lc"]
+    ):
+        score += 2
+        reasoning.append("Pain point alignment found in company background")
 
     # Determine rating
     if score >= 8:
@@ -372,30 +455,26 @@ def format_response_message(
 
 def extract_json_from_text(text: str) -> Optional[Dict[str, Any]]:
     """Extract JSON from text that might contain markdown or other formatting"""
-    import json
-
     # Try direct JSON parsing first
     try:
-        return json.loads(text)
+        return _json_loads(text)
     except:
         pass
 
     # Try to extract JSON from code blocks
-    json_pattern = r"```json\s*(\{.*?\})\s*```"
-    match = re.search(json_pattern, text, re.DOTALL)
+    match = _JSON_BLOCK_RE.search(text)
     if match:
         try:
-            return json.loads(match.group(1))
+            return _json_loads(match.group(1))
         except:
             pass
 
-    # Try to extract JSON objects
-    json_pattern = r"\{[^{}]*\}"
-    matches = re.findall(json_pattern, text)
-    for match in matches:
+    # Try to decode a JSON object, nested ones included, at each opening brace
+    start = text.find("{")
+    while start != -1:
         try:
-            return json.loads(match)
-        except:
-            continue
+            return _JSON_DECODER.raw_decode(text, start)[0]
+        except json.JSONDecodeError:
+            start = text.find("{", start + 1)
 
     return None
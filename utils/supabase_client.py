@@ -3,9 +3,18 @@ Supabase client for managing user credentials and data
 """
 
 import os
+import copy
+import time
+import inspect
+import functools
+import asyncio
 import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Sequence, Tuple, AsyncIterator
+from urllib.parse import urlsplit
+import asyncpg
 from supabase import create_client, Client
 from dotenv import load_dotenv
 
@@ -14,95 +23,317 @@ from .data_models import OAuthConnection, User
 
 logger = logging.getLogger(__name__)
 
+# Postgres connection pool settings
+POOL_MIN_SIZE = 10
+POOL_MAX_SIZE = 50
+POOL_MAX_INACTIVE_CONNECTION_LIFETIME = 300
+POOL_COMMAND_TIMEOUT = 60
+# Prepared statements cached per pooled connection, keyed by SQL text; disabled
+# behind Supavisor's transaction pooler, which does not keep them between
+# transactions
+POOL_STATEMENT_CACHE_SIZE = 100
+SUPAVISOR_TRANSACTION_PORT = 6543
+
+# In-process OAuth connection cache: entries live at most CONNECTION_CACHE_TTL
+# seconds and never past CONNECTION_CACHE_EXPIRY_MARGIN before token expiry
+CONNECTION_CACHE_TTL = 300
+CONNECTION_CACHE_EXPIRY_MARGIN = 60
+CONNECTION_CACHE_SIZE = 10_000
+
+
+# oauth_connections columns built from OAuthConnection's fields, so rows map
+# onto the model positionally; user_id is cast since it may be a uuid column
+_OAUTH_FIELDS = tuple(OAuthConnection.model_fields)
+OAUTH_COLS = ", ".join(
+    f"{field}::text" if field == "user_id" else field for field in _OAUTH_FIELDS
+)
+
+
+# Credential entries as returned by get_user_credentials, with expiry checked
+# by Postgres
+_CREDENTIAL_FIELDS = (
+    "access_token",
+    "refresh_token",
+    "expires_at",
+    "provider_email",
+    "is_expired",
+)
+_CREDENTIAL_COLUMNS = (
+    "access_token, refresh_token, token_expires_at, provider_email,"
+    " token_expires_at <= now()"
+)
+
+
+def _connection_from_row(row: asyncpg.Record) -> OAuthConnection:
+    """Build an OAuthConnection from a trusted row selected with OAUTH_COLS"""
+    return OAuthConnection.model_construct(**dict(zip(_OAUTH_FIELDS, row)))
+
+
+def _dbop(default: Any):
+    """Log failures of a database method and return a copy of default instead,
+    unless the client re-raises them"""
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            try:
+                return await func(self, *args, **kwargs)
+            except Exception:
+                if self._raise_errors:
+                    raise
+                arguments = signature.bind(self, *args, **kwargs).arguments
+                logger.exception(
+                    "%s failed: user=%s provider=%s",
+                    func.__name__,
+                    arguments.get("user_id"),
+                    arguments.get("provider"),
+                )
+                return copy.copy(default)
+
+        return wrapper
+
+    return decorator
+
+
+def _rows_affected(status: str) -> int:
+    """Row count from a command status tag such as 'UPDATE 1'"""
+    return int(status.rsplit(" ", 1)[-1])
+
 
 class SupabaseClient:
-    """Client for interacting with Supabase database"""
+    """Client for interacting with Supabase database
+
+    oauth_connections queries rely on the indexes in supabase/migrations:
+    oauth_active_lookup (user_id, provider) serves every lookup by user and
+    provider, and oauth_active_expiry serves get_expiring_oauth_connections.
+    """
+
+    # Failed calls are logged and return a fallback instead of raising
+    _raise_errors = False
 
     def __init__(self):
         self.url = os.getenv("SUPABASE_URL")
         self.key = os.getenv("SUPABASE_KEY")
+        self.db_url = os.getenv("SUPABASE_DB_URL")
 
         if not self.url or not self.key:
             raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set")
 
         self.client: Client = create_client(self.url, self.key)
+        # Postgres pool for the oauth_connections hot paths, opened in connect()
+        self.pool: Optional[asyncpg.Pool] = None
+        self._pool_lock = asyncio.Lock()
+        # (user_id, provider) -> (monotonic expiry, connection)
+        self._conn_cache: Dict[tuple[str, str], tuple[float, OAuthConnection]] = {}
+        self._conn_locks: Dict[tuple[str, str], asyncio.Lock] = defaultdict(
+            asyncio.Lock
+        )
+
+    async def connect(self):
+        """Open the Postgres connection pool"""
+        async with self._pool_lock:
+            if self.pool is None:
+                if not self.db_url:
+                    raise ValueError("SUPABASE_DB_URL must be set")
+                self.pool = await asyncpg.create_pool(
+                    self.db_url,
+                    min_size=POOL_MIN_SIZE,
+                    max_size=POOL_MAX_SIZE,
+                    max_inactive_connection_lifetime=POOL_MAX_INACTIVE_CONNECTION_LIFETIME,
+                    command_timeout=POOL_COMMAND_TIMEOUT,
+                    statement_cache_size=(
+                        0
+                        if urlsplit(self.db_url).port == SUPAVISOR_TRANSACTION_PORT
+                        else POOL_STATEMENT_CACHE_SIZE
+                    ),
+                )
+
+    async def close(self):
+        """Close the Postgres connection pool"""
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def __aenter__(self) -> "SupabaseClient":
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _get_pool(self) -> asyncpg.Pool:
+        """Postgres pool, opened on first use outside the app lifespan"""
+        if self.pool is None:
+            await self.connect()
+        return self.pool
+
+    def _cached_connection(self, key: tuple[str, str]) -> Optional[OAuthConnection]:
+        """Cached connection for (user_id, provider) if it has not expired"""
+        cached = self._conn_cache.get(key)
+        if cached and time.monotonic() < cached[0]:
+            return cached[1]
+        return None
+
+    def _cache_connection(self, key: tuple[str, str], connection: OAuthConnection):
+        """Cache a connection until shortly before its token expires"""
+        ttl = min(
+            CONNECTION_CACHE_TTL,
+            (connection.token_expires_at - datetime.now(timezone.utc)).total_seconds()
+            - CONNECTION_CACHE_EXPIRY_MARGIN,
+        )
+        if ttl <= 0:
+            return
+
+        self._conn_cache.pop(key, None)
+        if len(self._conn_cache) >= CONNECTION_CACHE_SIZE:
+            self._conn_cache.pop(next(iter(self._conn_cache)))
+        self._conn_cache[key] = (time.monotonic() + ttl, connection)
+
+    def _invalidate(self, key: tuple[str, str]):
+        """Drop a cached connection that is about to change"""
+        self._conn_cache.pop(key, None)
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator["SupabaseClient"]:
+        """Run several calls in one database transaction on one connection
+
+        The yielded client supports the same pool-backed methods but raises
+        on failure, rolling the whole transaction back; REST calls
+        (get_user_profile, create_oauth_connection) are not part of it.
+        """
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            tx = _TxClient(self, conn)
+            try:
+                async with conn.transaction():
+                    yield tx
+            finally:
+                # Readers may have re-cached old rows before the commit landed
+                for key in tx._written:
+                    self._invalidate(key)
 
+    @_dbop([])
     async def get_user_oauth_connections(self, user_id: str) -> List[OAuthConnection]:
         """Get all OAuth connections for a user"""
-        try:
-            response = (
-                self.client.table("oauth_connections")
-                .select("*")
-                .eq("user_id", user_id)
-                .eq("is_active", True)
-                .execute()
-            )
+        pool = await self._get_pool()
+        rows = await pool.fetch(
+            f"SELECT {OAUTH_COLS} FROM oauth_connections"
+            " WHERE user_id = $1 AND is_active",
+            user_id,
+        )
 
-            connections = []
-            for row in response.data:
-                connections.append(
-                    OAuthConnection(
-                        user_id=row["user_id"],
-                        provider=row["provider"],
-                        provider_email=row["provider_email"],
-                        access_token=row["access_token"],
-                        refresh_token=row["refresh_token"],
-                        token_expires_at=datetime.fromisoformat(
-                            row["token_expires_at"].replace("Z", "+00:00")
-                        ),
-                        is_active=row["is_active"],
-                        created_at=datetime.fromisoformat(
-                            row["created_at"].replace("Z", "+00:00")
-                        ),
-                        updated_at=datetime.fromisoformat(
-                            row["updated_at"].replace("Z", "+00:00")
-                        ),
-                    )
-                )
+        return [_connection_from_row(row) for row in rows]
 
-            return connections
-        except Exception as e:
-            logger.error(f"Error getting OAuth connections for user {user_id}: {e}")
-            return []
+    @_dbop([])
+    async def get_expiring_oauth_connections(
+        self, expires_before: datetime, expires_after: Optional[datetime] = None
+    ) -> List[OAuthConnection]:
+        """Get active OAuth connections whose tokens expire between expires_after
+        (default now) and expires_before"""
+        pool = await self._get_pool()
+        rows = await pool.fetch(
+            f"SELECT {OAUTH_COLS} FROM oauth_connections WHERE is_active"
+            " AND token_expires_at BETWEEN COALESCE($2, now()) AND $1",
+            expires_before,
+            expires_after,
+        )
+
+        return [_connection_from_row(row) for row in rows]
 
+    @_dbop(None)
     async def get_oauth_connection(
         self, user_id: str, provider: str
     ) -> Optional[OAuthConnection]:
         """Get specific OAuth connection for a user and provider"""
+        key = (user_id, provider)
+        connection = self._cached_connection(key)
+        if connection:
+            return connection
+
+        # Concurrent misses for the same key share one query
+        lock = self._conn_locks[key]
         try:
-            response = (
-                self.client.table("oauth_connections")
-                .select("*")
-                .eq("user_id", user_id)
-                .eq("provider", provider)
-                .eq("is_active", True)
-                .execute()
-            )
+            async with lock:
+                connection = self._cached_connection(key)
+                if connection:
+                    return connection
 
-            if response.data:
-                row = response.data[0]
-                return OAuthConnection(
-                    user_id=row["user_id"],
-                    provider=row["provider"],
-                    provider_email=row["provider_email"],
-                    access_token=row["access_token"],
-                    refresh_token=row["refresh_token"],
-                    token_expires_at=datetime.fromisoformat(
-                        row["token_expires_at"].replace("Z", "+00:00")
-                    ),
-                    is_active=row["is_active"],
-                    created_at=datetime.fromisoformat(
-                        row["created_at"].replace("Z", "+00:00")
-                    ),
-                    updated_at=datetime.fromisoformat(
-                        row["updated_at"].replace("Z", "+00:00")
-                    ),
+                pool = await self._get_pool()
+                row = await pool.fetchrow(
+                    f"SELECT {OAUTH_COLS} FROM oauth_connections"
+                    " WHERE user_id = $1 AND provider = $2 AND is_active",
+                    user_id,
+                    provider,
                 )
-            return None
-        except Exception as e:
-            logger.error(f"Error getting {provider} connection for user {user_id}: {e}")
-            return None
 
+                if row:
+                    connection = _connection_from_row(row)
+                    self._cache_connection(key, connection)
+                    return connection
+                return None
+        finally:
+            # Drop the lock once no miss is using it so the map stays bounded
+            if not lock.locked() and self._conn_locks.get(key) is lock:
+                del self._conn_locks[key]
+
+    @_dbop((None, False))
+    async def get_valid_oauth_connection(
+        self, user_id: str, provider: str, skew: float = 60
+    ) -> Tuple[Optional[OAuthConnection], bool]:
+        """Read a connection straight from the database along with whether its
+        token expires within skew seconds and needs a refresh"""
+        pool = await self._get_pool()
+        row = await pool.fetchrow(
+            f"SELECT {OAUTH_COLS},"
+            " token_expires_at <= now() + make_interval(secs => $3)"
+            " AS needs_refresh FROM oauth_connections"
+            " WHERE user_id = $1 AND provider = $2 AND is_active",
+            user_id,
+            provider,
+            skew,
+        )
+
+        if row:
+            connection = _connection_from_row(row)
+            self._cache_connection((user_id, provider), connection)
+            return connection, row["needs_refresh"]
+        return None, False
+
+    @_dbop({})
+    async def get_oauth_connections(
+        self, user_id: str, providers: Sequence[str]
+    ) -> Dict[str, OAuthConnection]:
+        """Get a user's OAuth connections for several providers, fetching cache
+        misses in one query"""
+        connections = {}
+        for provider in providers:
+            connection = self._cached_connection((user_id, provider))
+            if connection:
+                connections[provider] = connection
+
+        missing = [provider for provider in providers if provider not in connections]
+        if not missing:
+            return connections
+
+        pool = await self._get_pool()
+        rows = await pool.fetch(
+            f"SELECT {OAUTH_COLS} FROM oauth_connections"
+            " WHERE user_id = $1 AND provider = ANY($2::text[]) AND is_active",
+            user_id,
+            missing,
+        )
+
+        for row in rows:
+            if row["provider"] not in connections:
+                connection = _connection_from_row(row)
+                connections[connection.provider] = connection
+                self._cache_connection((user_id, connection.provider), connection)
+
+        return connections
+
+    @_dbop(False)
     async def update_oauth_tokens(
         self,
         user_id: str,
@@ -112,113 +343,205 @@ class SupabaseClient:
         expires_in: int = 3600,
     ) -> bool:
         """Update OAuth tokens for a user and provider"""
-        try:
-            expires_at = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
-
-            update_data = {
-                "access_token": access_token,
-                "token_expires_at": expires_at.isoformat(),
-                "updated_at": datetime.now(timezone.utc).isoformat(),
-            }
-
-            if refresh_token:
-                update_data["refresh_token"] = refresh_token
-
-            response = (
-                self.client.table("oauth_connections")
-                .update(update_data)
-                .eq("user_id", user_id)
-                .eq("provider", provider)
-                .execute()
-            )
+        self._invalidate((user_id, provider))
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(seconds=expires_in)
 
-            return len(response.data) > 0
-        except Exception as e:
-            logger.error(f"Error updating {provider} tokens for user {user_id}: {e}")
-            return False
+        pool = await self._get_pool()
+        # Keep the stored refresh token when the provider does not rotate it
+        status = await pool.execute(
+            "UPDATE oauth_connections"
+            " SET access_token = $1, token_expires_at = $2, updated_at = $3,"
+            " refresh_token = COALESCE($4, refresh_token)"
+            " WHERE user_id = $5 AND provider = $6",
+            access_token,
+            expires_at,
+            now,
+            refresh_token or None,
+            user_id,
+            provider,
+        )
 
+        return _rows_affected(status) > 0
+
+    @_dbop(None)
     async def get_user_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user profile data"""
-        try:
-            response = (
-                self.client.table("profiles").select("*").eq("id", user_id).execute()
-            )
+        # supabase-py's REST client is synchronous; keep it off the event loop
+        query = self.client.table("profiles").select("*").eq("id", user_id)
+        response = await asyncio.to_thread(query.execute)
 
-            if response.data:
-                return response.data[0]
-            return None
-        except Exception as e:
-            logger.error(f"Error getting user profile for {user_id}: {e}")
-            return None
+        if response.data:
+            return response.data[0]
+        return None
 
+    @_dbop(False)
     async def create_oauth_connection(self, connection: OAuthConnection) -> bool:
         """Create a new OAuth connection"""
-        try:
-            data = {
-                "user_id": connection.user_id,
-                "provider": connection.provider,
-                "provider_email": connection.provider_email,
-                "access_token": connection.access_token,
-                "refresh_token": connection.refresh_token,
-                "token_expires_at": connection.token_expires_at.isoformat(),
-                "is_active": connection.is_active,
-                "created_at": connection.created_at.isoformat(),
-                "updated_at": connection.updated_at.isoformat(),
-            }
-
-            response = self.client.table("oauth_connections").insert(data).execute()
-            return len(response.data) > 0
-        except Exception as e:
-            logger.error(f"Error creating OAuth connection: {e}")
-            return False
+        self._invalidate((connection.user_id, connection.provider))
+        data = {
+            "user_id": connection.user_id,
+            "provider": connection.provider,
+            "provider_email": connection.provider_email,
+            "access_token": connection.access_token,
+            "refresh_token": connection.refresh_token,
+            "token_expires_at": connection.token_expires_at.isoformat(),
+            "is_active": connection.is_active,
+            "created_at": connection.created_at.isoformat(),
+            "updated_at": connection.updated_at.isoformat(),
+        }
+
+        query = self.client.table("oauth_connections").insert(data)
+        response = await asyncio.to_thread(query.execute)
+        return len(response.data) > 0
 
+    @_dbop(0)
+    async def create_oauth_connections_bulk(
+        self, connections: Sequence[OAuthConnection]
+    ) -> int:
+        """Create many OAuth connections with one COPY, returning the row count"""
+        for connection in connections:
+            self._invalidate((connection.user_id, connection.provider))
+
+        pool = await self._get_pool()
+        status = await pool.copy_records_to_table(
+            "oauth_connections",
+            records=[
+                tuple(getattr(connection, field) for field in _OAUTH_FIELDS)
+                for connection in connections
+            ],
+            columns=_OAUTH_FIELDS,
+        )
+
+        return _rows_affected(status)
+
+    @_dbop(False)
     async def deactivate_oauth_connection(self, user_id: str, provider: str) -> bool:
         """Deactivate an OAuth connection"""
-        try:
-            response = (
-                self.client.table("oauth_connections")
-                .update(
-                    {
-                        "is_active": False,
-                        "updated_at": datetime.now(timezone.utc).isoformat(),
-                    }
-                )
-                .eq("user_id", user_id)
-                .eq("provider", provider)
-                .execute()
-            )
+        self._invalidate((user_id, provider))
+        pool = await self._get_pool()
+        status = await pool.execute(
+            "UPDATE oauth_connections SET is_active = false, updated_at = now()"
+            " WHERE user_id = $1 AND provider = $2",
+            user_id,
+            provider,
+        )
 
-            return len(response.data) > 0
-        except Exception as e:
-            logger.error(
-                f"Error deactivating {provider} connection for user {user_id}: {e}"
-            )
-            return False
+        return _rows_affected(status) > 0
 
+    @_dbop(True)
     async def is_token_expired(self, user_id: str, provider: str) -> bool:
         """Check if a token is expired"""
-        connection = await self.get_oauth_connection(user_id, provider)
-        if not connection:
+        connection = self._cached_connection((user_id, provider))
+        if connection:
+            expires_at = connection.token_expires_at
+        else:
+            pool = await self._get_pool()
+            expires_at = await pool.fetchval(
+                "SELECT token_expires_at FROM oauth_connections"
+                " WHERE user_id = $1 AND provider = $2 AND is_active",
+                user_id,
+                provider,
+            )
+
+        if expires_at is None:
             return True
 
-        return datetime.now(timezone.utc) >= connection.token_expires_at
+        return datetime.now(timezone.utc) >= expires_at
 
+    @_dbop({})
     async def get_user_credentials(self, user_id: str) -> Dict[str, Any]:
         """Get all user credentials organized by provider"""
-        connections = await self.get_user_oauth_connections(user_id)
+        pool = await self._get_pool()
+        rows = await pool.fetch(
+            f"SELECT provider, {_CREDENTIAL_COLUMNS} FROM oauth_connections"
+            " WHERE user_id = $1 AND is_active",
+            user_id,
+        )
 
         credentials = {}
-        for conn in connections:
-            credentials[conn.provider] = {
-                "access_token": conn.access_token,
-                "refresh_token": conn.refresh_token,
-                "expires_at": conn.token_expires_at,
-                "provider_email": conn.provider_email,
-                "is_expired": datetime.now(timezone.utc) >= conn.token_expires_at,
-            }
+        for provider, *values in rows:
+            credentials[provider] = dict(zip(_CREDENTIAL_FIELDS, values))
+
+        return credentials
+
+    @_dbop({})
+    async def get_user_credentials_many(
+        self, user_ids: Sequence[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """Get credentials for several users in one query, keyed by user ID"""
+        pool = await self._get_pool()
+        rows = await pool.fetch(
+            f"SELECT user_id::text, provider, {_CREDENTIAL_COLUMNS}"
+            " FROM oauth_connections"
+            " WHERE user_id = ANY($1) AND is_active",
+            list(user_ids),
+        )
+
+        credentials: Dict[str, Dict[str, Any]] = {user_id: {} for user_id in user_ids}
+        for user_id, provider, *values in rows:
+            credentials.setdefault(user_id, {})[provider] = dict(
+                zip(_CREDENTIAL_FIELDS, values)
+            )
 
         return credentials
 
+    async def get_user_bundle(
+        self, user_id: str
+    ) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+        """Get a user's profile and credentials concurrently"""
+        profile, credentials = await asyncio.gather(
+            self.get_user_profile(user_id), self.get_user_credentials(user_id)
+        )
+        return profile, credentials
+
+
+class _TxClient(SupabaseClient):
+    """SupabaseClient bound to one connection inside a transaction"""
+
+    # Errors must reach the transaction block so it rolls back and the
+    # caller learns its earlier writes were discarded
+    _raise_errors = True
+
+    def __init__(self, parent: SupabaseClient, conn: asyncpg.Connection):
+        self.client = parent.client
+        self._parent = parent
+        self._tx_conn = conn
+        # Uncommitted rows are cached for this transaction only
+        self._conn_cache = {}
+        self._conn_locks = defaultdict(asyncio.Lock)
+        self._written: set[tuple[str, str]] = set()
+
+    async def _get_pool(self) -> asyncpg.Connection:
+        return self._tx_conn
+
+    def _invalidate(self, key: tuple[str, str]):
+        self._conn_cache.pop(key, None)
+        self._parent._invalidate(key)
+        self._written.add(key)
+
+
+# Shared instance, built on first use so importing this module needs no
+# configuration and opens no connections
+_instance: Optional[SupabaseClient] = None
+_instance_lock = asyncio.Lock()
+
+
+async def get_supabase_client() -> SupabaseClient:
+    """Shared SupabaseClient with its connection pool open"""
+    global _instance
+    if _instance is None:
+        async with _instance_lock:
+            if _instance is None:
+                client = SupabaseClient()
+                await client.__aenter__()
+                _instance = client
+    return _instance
+
 
-# Global instance
-supabase_client = SupabaseClient()
+async def close_supabase_client():
+    """Close the shared SupabaseClient, if it was ever opened"""
+    global _instance
+    if _instance is not None:
+        await _instance.__aexit__(None, None, None)
+        _instance = None